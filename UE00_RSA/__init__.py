@@ -1,4 +1,5 @@
-# generated by is_prime_miller_rabin()
+# generated by python -m UE00_RSA.small_primes, do not edit
+# kept for compatibility only, the package uses small_primes.small_primes()
 
 PRIMES = [
     2,
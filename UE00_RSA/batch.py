@@ -0,0 +1,188 @@
+__author__ = "Karun Sandhu"
+
+import glob
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+from pathlib import Path
+from typing import Callable, Iterable
+
+from UE00_RSA import hybrid
+from UE00_RSA.keystore import KeyInfo, find_key, load_key
+from UE00_RSA.rsa import decrypt_block, transform_stream
+
+logger = logging.getLogger(__name__)
+
+
+def _pattern_root(pattern: str) -> Path:
+    """
+    Returns the directory part of a glob pattern that contains no wildcards.
+
+    >>> _pattern_root("data/**/*.txt").as_posix()
+    'data'
+    >>> _pattern_root("*.txt").as_posix()
+    '.'
+    """
+    root = Path()
+    for part in Path(pattern).parts:
+        if glob.has_magic(part):
+            break
+        root /= part
+    return root
+
+
+def collect_files(
+    patterns: Iterable[str], decrypt: bool = False
+) -> list[tuple[Path, Path]]:
+    """
+    Expands files, directories (recursively) and glob patterns.
+
+    Inside directories only *.enc files are taken for decryption, and *.enc and
+    *.dec files are skipped for encryption. Explicitly named files are always
+    taken.
+
+    :param patterns: the files, directories or glob patterns
+    :param decrypt: True if the files are going to be decrypted
+    :return: every file together with the root its mirror path is relative to
+    """
+    files: dict[Path, Path] = {}
+    for pattern in patterns:
+        path = Path(pattern)
+        if path.is_dir():
+            candidates = (p for p in sorted(path.rglob("*")) if p.is_file())
+            for p in candidates:
+                if (p.suffix == ".enc") == decrypt and p.suffix != ".dec":
+                    files.setdefault(p, path)
+        elif glob.has_magic(pattern):
+            root = _pattern_root(pattern)
+            for match in sorted(glob.glob(pattern, recursive=True)):
+                if Path(match).is_file():
+                    files.setdefault(Path(match), root)
+        elif path.is_file():
+            files.setdefault(path, path.parent)
+        else:
+            raise FileNotFoundError(f"No such file or directory: {pattern}")
+    return list(files.items())
+
+
+def output_path(path: Path, root: Path, out_dir: str | None, suffix: str) -> Path:
+    """
+    Returns where the result for path is written: next to the input, or at the
+    same position below out_dir as path is below root.
+
+    >>> output_path(Path("a/b/c.txt"), Path("a"), None, ".enc").as_posix()
+    'a/b/c.txt.enc'
+    >>> output_path(Path("a/b/c.txt"), Path("a"), "out", ".enc").as_posix()
+    'out/b/c.txt.enc'
+    """
+    if out_dir is None:
+        return path.with_name(path.name + suffix)
+    return Path(out_dir) / path.relative_to(root).with_name(path.name + suffix)
+
+
+# the key information of a worker process, set once per worker by _init_worker()
+_worker_job: tuple[KeyInfo, Callable[[int], int], bool, str] | None = None
+
+
+def _init_worker(info: KeyInfo, decrypt: bool, mode: str) -> None:
+    global _worker_job
+    if decrypt:
+        transform = partial(decrypt_block, private=info.key)
+    else:
+        transform = partial(pow, exp=info.key[0], mod=info.key[1])
+    _worker_job = (info, transform, decrypt, mode)
+
+
+def _process_file(src: Path, dst: Path) -> tuple[Path, Path, int, float]:
+    assert _worker_job is not None
+    info, transform, decrypt, mode = _worker_job
+
+    start = time.perf_counter()
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    with open(src, "rb") as f_in, open(dst, "wb") as f_out:
+        if decrypt and hybrid.is_hybrid(f_in, info.cipher_bytes):
+            try:
+                hybrid.decrypt_stream(f_in, f_out, transform)
+            except ValueError:
+                f_out.close()
+                dst.unlink()
+                raise
+        elif decrypt:
+            transform_stream(
+                f_in, f_out, info.cipher_bytes, info.plain_bytes, transform
+            )
+        elif mode == "hybrid":
+            hybrid.encrypt_stream(f_in, f_out, info.key)
+        else:
+            transform_stream(
+                f_in, f_out, info.plain_bytes, info.cipher_bytes, transform
+            )
+    return src, dst, os.path.getsize(src), time.perf_counter() - start
+
+
+def batch_process(
+    patterns: Iterable[str],
+    decrypt: bool = False,
+    jobs: int = 1,
+    out_dir: str | None = None,
+    mode: str = "block",
+) -> list[tuple[Path, Path, int, float]]:
+    """
+    Encrypts or decrypts many files with a single key load. The key is found
+    and parsed once and sent to every worker process once.
+
+    :param patterns: the files, directories or glob patterns to process
+    :param decrypt: True to decrypt instead of encrypt
+    :param jobs: the number of worker processes, 0 for one per CPU
+    :param out_dir: the directory to mirror the input tree into (default: next to the input)
+    :param mode: the encryption mode, "block" or "hybrid" (decryption detects it per file)
+    :return: input, output, input size and seconds for every file
+    """
+    info = load_key(find_key(private=decrypt), private=decrypt)
+    logger.info("Using %s key from %s", "private" if decrypt else "public", info.path)
+
+    suffix = ".dec" if decrypt else ".enc"
+    tasks = [
+        (path, output_path(path, root, out_dir, suffix))
+        for path, root in collect_files(patterns, decrypt)
+    ]
+    logger.info("Processing %d files", len(tasks))
+
+    results = []
+    start = time.perf_counter()
+    if jobs == 1:
+        _init_worker(info, decrypt, mode)
+        for src, dst in tasks:
+            results.append(_process_file(src, dst))
+            _report(*results[-1])
+    else:
+        with ProcessPoolExecutor(
+            max_workers=jobs or None,
+            initializer=_init_worker,
+            initargs=(info, decrypt, mode),
+        ) as executor:
+            futures = [executor.submit(_process_file, src, dst) for src, dst in tasks]
+            for future in as_completed(futures):
+                results.append(future.result())
+                _report(*results[-1])
+    elapsed = time.perf_counter() - start
+
+    total = sum(size for _, _, size, _ in results)
+    print(
+        f"{len(results)} files, {total} bytes in {elapsed:.3f} s "
+        f"({_mb_per_s(total, elapsed)} MB/s)"
+    )
+    return results
+
+
+def _mb_per_s(size: int, seconds: float) -> float:
+    return round(size / seconds / 1e6, 3) if seconds > 0 else 0.0
+
+
+def _report(src: Path, dst: Path, size: int, seconds: float) -> None:
+    print(
+        f"{src} -> {dst}: {size} bytes in {seconds:.3f} s "
+        f"({_mb_per_s(size, seconds)} MB/s)"
+    )
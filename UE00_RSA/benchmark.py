@@ -0,0 +1,332 @@
+__author__ = "Karun Sandhu"
+
+import argparse
+import csv
+import json
+import logging
+import math
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Any, Callable
+
+from UE00_RSA.miller_rabin import generate_prime
+from UE00_RSA.rsa import decrypt_file, encrypt_file, generate_keys, save_keys
+from UE00_RSA.rsa_attack import crack_rsa
+
+logger = logging.getLogger(__name__)
+
+FIELDNAMES = [
+    "name",
+    "bits",
+    "runs",
+    "median",
+    "p95",
+    "min",
+    "rate",
+    "rate_unit",
+    "peak_rss_kb",
+]
+
+
+def percentile(values: list[float], q: float) -> float:
+    """
+    Returns the q-th percentile (nearest rank) of values.
+
+    >>> percentile([3.0, 1.0, 2.0, 4.0], 50)
+    2.0
+    >>> percentile(list(range(1, 101)), 95)
+    95
+    """
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def measure(
+    func: Callable[[Any], Any],
+    setup: Callable[[], Any] = lambda: None,
+    repeat: int = 5,
+    warmup: int = 1,
+) -> list[float]:
+    """
+    Times func(setup()) repeat times after warmup untimed calls. setup() is
+    never timed, so it can prepare fresh input for every run.
+
+    :return: the duration of every timed run in seconds
+
+    >>> len(measure(lambda _: sum(range(1000)), repeat=3))
+    3
+    """
+    for _ in range(warmup):
+        func(setup())
+
+    times = []
+    for _ in range(repeat):
+        arg = setup()
+        start = time.perf_counter()
+        func(arg)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def _bench_generate_prime(bits: int, repeat: int, warmup: int, **_) -> tuple:
+    # primes for a key of the given size, like generate_keys() draws them
+    times = measure(lambda _: generate_prime(bits // 2), repeat=repeat, warmup=warmup)
+    return times, 1, "primes/s"
+
+
+def _bench_generate_keys(bits: int, repeat: int, warmup: int, **_) -> tuple:
+    times = measure(lambda _: generate_keys(bits), repeat=repeat, warmup=warmup)
+    return times, 1, "keys/s"
+
+
+def _bench_file(
+    bits: int, repeat: int, warmup: int, decrypt: bool, mode: str, size: int, **_
+) -> tuple:
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            save_keys(bits)
+            with open("data", "wb") as f:
+                f.write(os.urandom(size))
+            encrypt_file("data", "data.enc", mode=mode)
+
+            if decrypt:
+                times = measure(
+                    lambda _: decrypt_file("data.enc", "data.dec"),
+                    repeat=repeat,
+                    warmup=warmup,
+                )
+            else:
+                times = measure(
+                    lambda _: encrypt_file("data", "data.enc", mode=mode),
+                    repeat=repeat,
+                    warmup=warmup,
+                )
+        finally:
+            os.chdir(cwd)
+    return times, size / 1e6, "MB/s"
+
+
+def _bench_crack_rsa(bits: int, repeat: int, warmup: int, tries: int, **_) -> tuple:
+    # factors of very different size, so Fermat never succeeds within tries
+    logging.getLogger(crack_rsa.__module__).setLevel(logging.CRITICAL)
+    n = generate_prime(bits // 2 - 8) * generate_prime(bits // 2 + 8)
+
+    def run(_) -> None:
+        try:
+            crack_rsa(n, max_tries=tries)
+        except ValueError:
+            pass
+
+    times = measure(run, repeat=repeat, warmup=warmup)
+    return times, tries, "tries/s"
+
+
+BENCHMARKS: dict[str, Callable[..., tuple]] = {
+    "generate_prime": _bench_generate_prime,
+    "generate_keys": _bench_generate_keys,
+    "encrypt_file": lambda **kw: _bench_file(decrypt=False, mode="block", **kw),
+    "decrypt_file": lambda **kw: _bench_file(decrypt=True, mode="block", **kw),
+    "encrypt_file_hybrid": lambda **kw: _bench_file(
+        decrypt=False, mode="hybrid", **{**kw, "size": kw["hybrid_size"]}
+    ),
+    "decrypt_file_hybrid": lambda **kw: _bench_file(
+        decrypt=True, mode="hybrid", **{**kw, "size": kw["hybrid_size"]}
+    ),
+    "crack_rsa": _bench_crack_rsa,
+}
+
+
+def _run_case(name: str, bits: int, options: dict[str, int]) -> dict[str, Any]:
+    """
+    Runs one benchmark. It is executed in a fresh process, so ru_maxrss is the
+    peak resident set size of this benchmark alone.
+    """
+    times, work, unit = BENCHMARKS[name](bits=bits, **options)
+    median = statistics.median(times)
+    return {
+        "name": name,
+        "bits": bits,
+        "runs": len(times),
+        "median": median,
+        "p95": percentile(times, 95),
+        "min": min(times),
+        "rate": work / median if median > 0 else 0.0,
+        "rate_unit": unit,
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def run_suite(
+    names: list[str],
+    key_sizes: list[int],
+    repeat: int = 5,
+    warmup: int = 1,
+    size: int = 64 << 10,
+    hybrid_size: int = 16 << 20,
+    tries: int = 200_000,
+) -> list[dict[str, Any]]:
+    """
+    Runs every benchmark in names for every key size, each in its own process.
+
+    :param names: the benchmarks to run, keys of BENCHMARKS
+    :param key_sizes: the key sizes in bits
+    :param repeat: the number of timed runs
+    :param warmup: the number of untimed runs before
+    :param size: the file size in bytes for block mode file benchmarks
+    :param hybrid_size: the file size in bytes for hybrid mode file benchmarks
+    :param tries: the number of Fermat tries per crack_rsa run
+    :return: one result per benchmark and key size
+    """
+    options = {
+        "repeat": repeat,
+        "warmup": warmup,
+        "size": size,
+        "hybrid_size": hybrid_size,
+        "tries": tries,
+    }
+    results = []
+    for name in names:
+        for bits in key_sizes:
+            logger.info("Running %s with %d bits...", name, bits)
+            with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as executor:
+                result = executor.submit(_run_case, name, bits, options).result()
+            logger.info(
+                "%s %d: median %.6f s, p95 %.6f s, %.3f %s",
+                name,
+                bits,
+                result["median"],
+                result["p95"],
+                result["rate"],
+                result["rate_unit"],
+            )
+            results.append(result)
+    return results
+
+
+def write_results(results: list[dict[str, Any]], filename: str) -> None:
+    """
+    Writes results as JSON, or as CSV if filename ends with .csv.
+    """
+    with open(filename, "w", newline="") as f:
+        if filename.endswith(".csv"):
+            writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
+            writer.writeheader()
+            writer.writerows(results)
+        else:
+            json.dump(results, f, indent=2)
+    print(f"✅ Benchmark results written to {filename}")
+
+
+def load_results(filename: str) -> list[dict[str, Any]]:
+    """
+    Reads results written by write_results().
+    """
+    with open(filename, newline="") as f:
+        if not filename.endswith(".csv"):
+            return json.load(f)
+        return [
+            {**row, "bits": int(row["bits"]), "median": float(row["median"])}
+            for row in csv.DictReader(f)
+        ]
+
+
+def compare(
+    baseline: list[dict[str, Any]],
+    results: list[dict[str, Any]],
+    threshold: float = 0.1,
+) -> list[tuple[str, int, float, float, float]]:
+    """
+    Compares the median times of results against a baseline.
+
+    :param baseline: the stored results
+    :param results: the new results
+    :param threshold: the allowed slowdown, 0.1 = 10 %
+    :return: name, bits, baseline median, new median and change of every regression
+
+    >>> old = [{"name": "a", "bits": 8, "median": 1.0}, {"name": "b", "bits": 8, "median": 1.0}]
+    >>> new = [{"name": "a", "bits": 8, "median": 1.5}, {"name": "b", "bits": 8, "median": 1.05}]
+    >>> compare(old, new)
+    [('a', 8, 1.0, 1.5, 0.5)]
+    """
+    old = {(r["name"], r["bits"]): r["median"] for r in baseline}
+    regressions = []
+    for result in results:
+        key = (result["name"], result["bits"])
+        if key not in old:
+            continue
+        change = result["median"] / old[key] - 1
+        if change > threshold:
+            regressions.append((*key, old[key], result["median"], round(change, 4)))
+    return regressions
+
+
+if __name__ == "__main__":
+    import doctest
+
+    doctest.testmod()
+
+    parser = argparse.ArgumentParser(description="Benchmark the RSA package.")
+    parser.add_argument(
+        "-b",
+        "--benchmarks",
+        nargs="+",
+        default=list(BENCHMARKS),
+        choices=list(BENCHMARKS),
+        help="benchmarks to run (default: all)",
+    )
+    parser.add_argument(
+        "-k",
+        "--key-sizes",
+        nargs="+",
+        type=int,
+        default=[1024, 2048],
+        help="key sizes in bits (default: 1024 2048)",
+    )
+    parser.add_argument("-r", "--repeat", type=int, default=5, help="timed runs")
+    parser.add_argument("-w", "--warmup", type=int, default=1, help="untimed runs")
+    parser.add_argument(
+        "-o",
+        "--output",
+        nargs="+",
+        default=["benchmark_results.json"],
+        help="result files, .json or .csv (default: benchmark_results.json)",
+    )
+    parser.add_argument(
+        "-c", "--compare", metavar="BASELINE", help="baseline results to compare with"
+    )
+    parser.add_argument(
+        "-t",
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="allowed slowdown of the median against the baseline (default: 0.1)",
+    )
+    parser.add_argument(
+        "-v", "--verbose", action="store_true", help="Enable verbose output"
+    )
+    args = parser.parse_args()
+
+    level = logging.INFO if args.verbose else logging.WARNING
+    logging.basicConfig(level=level, format="%(levelname)s: %(message)s")
+
+    results = run_suite(args.benchmarks, args.key_sizes, args.repeat, args.warmup)
+    for filename in args.output:
+        write_results(results, filename)
+
+    if args.compare:
+        regressions = compare(load_results(args.compare), results, args.threshold)
+        for name, bits, old, new, change in regressions:
+            print(
+                f"REGRESSION {name} {bits}: {old:.6f} s -> {new:.6f} s (+{change:.1%})"
+            )
+        if regressions:
+            sys.exit(1)
+        print("No regressions")
@@ -0,0 +1,287 @@
+__author__ = "Karun Sandhu"
+
+import argparse
+import logging
+import math
+import queue
+import time
+from multiprocessing import Pool
+from typing import Callable, NamedTuple
+
+from UE00_RSA.miller_rabin import is_prime
+from UE00_RSA.rsa_attack import crack_rsa
+from UE00_RSA.small_primes import SMALL_PRIME_LIMIT, small_primes
+
+logger = logging.getLogger(__name__)
+
+# the deadline is checked after this many iterations of a strategy
+CHECK_INTERVAL = 1 << 10
+# factors collected before a gcd in Pollard rho
+RHO_BATCH = 128
+
+
+class FactorResult(NamedTuple):
+    """
+    The factors found for a number and which strategy found them.
+    """
+
+    p: int
+    q: int
+    strategy: str
+    seconds: float
+
+
+def _expired(deadline: float | None) -> bool:
+    return deadline is not None and time.monotonic() > deadline
+
+
+def trial_division(
+    n: int, deadline: float | None = None, max_iterations: int | None = None
+) -> int | None:
+    """
+    Tries every prime below SMALL_PRIME_LIMIT (or max_iterations primes).
+
+    >>> trial_division(1009 * (2**61 - 1))
+    1009
+    >>> trial_division((2**31 - 1) * (2**61 - 1)) is None
+    True
+    """
+    primes = small_primes()[:max_iterations]
+    for i, q in enumerate(primes):
+        if q * q > n:
+            break
+        if n % q == 0:
+            return q
+        if i % CHECK_INTERVAL == 0 and _expired(deadline):
+            break
+    return None
+
+
+def pollard_rho(
+    n: int, deadline: float | None = None, max_iterations: int | None = None
+) -> int | None:
+    """
+    Pollard's rho with Brent's cycle detection. The differences are multiplied
+    together and only every RHO_BATCH steps a gcd is taken. If a batch hits
+    the cycle all at once it is replayed one step at a time, if even that
+    gives n the polynomial x^2 + c is changed.
+
+    >>> pollard_rho(1_000_003 * 1_000_033) in (1_000_003, 1_000_033)
+    True
+    """
+    iterations = 0
+    for c in range(1, n):
+        y, r, g, product = 2, 1, 1, 1
+        while g == 1:
+            x = y
+            for _ in range(r):
+                y = (y * y + c) % n
+            k = 0
+            while k < r and g == 1:
+                saved = y
+                for _ in range(min(RHO_BATCH, r - k)):
+                    y = (y * y + c) % n
+                    product = product * abs(x - y) % n
+                g = math.gcd(product, n)
+                k += RHO_BATCH
+                iterations += RHO_BATCH
+                if max_iterations is not None and iterations >= max_iterations:
+                    return None
+                if iterations % CHECK_INTERVAL == 0 and _expired(deadline):
+                    return None
+            r *= 2
+
+        if g == n:
+            # the batch overshot, redo it step by step from its start
+            g = 1
+            while g == 1:
+                saved = (saved * saved + c) % n
+                g = math.gcd(abs(x - saved), n)
+        if g != n:
+            return g
+    return None
+
+
+def pollard_p_minus_1(
+    n: int, deadline: float | None = None, max_iterations: int | None = None
+) -> int | None:
+    """
+    Pollard's p - 1, stage one: finds p if p - 1 only has prime power factors
+    below SMALL_PRIME_LIMIT (or below the max_iterations-th prime).
+
+    >>> pollard_p_minus_1(1_000_003 * 1_000_000_000_000_037)
+    1000003
+    """
+    a = 2
+    primes = small_primes()[:max_iterations]
+    for i, q in enumerate(primes):
+        # the largest power of q not above the bound
+        a = pow(a, q ** int(math.log(SMALL_PRIME_LIMIT, q)), n)
+        if i % CHECK_INTERVAL == 0 or i == len(primes) - 1:
+            g = math.gcd(a - 1, n)
+            if g == n:
+                return None
+            if g > 1:
+                return g
+            if _expired(deadline):
+                return None
+    return None
+
+
+def fermat(
+    n: int, deadline: float | None = None, max_iterations: int | None = None
+) -> int | None:
+    """
+    Fermat factorization with crack_rsa(), fast if the factors are close to
+    sqrt(n). crack_rsa() does not check the deadline, factor() stops it by
+    terminating its worker process.
+
+    >>> fermat(1_000_003 * 1_000_033)
+    1000003
+    """
+    try:
+        p, _, _ = crack_rsa(n, max_tries=max_iterations)
+    except ValueError:
+        return None
+    return p if 1 < p < n else None
+
+
+STRATEGIES: dict[str, Callable[[int, float | None, int | None], int | None]] = {
+    "trial": trial_division,
+    "rho": pollard_rho,
+    "p-1": pollard_p_minus_1,
+    "fermat": fermat,
+}
+
+
+def _run_strategy(
+    name: str, n: int, deadline: float | None, max_iterations: int | None
+) -> tuple[str, int | None, float]:
+    start = time.perf_counter()
+    factor = STRATEGIES[name](n, deadline, max_iterations)
+    return name, factor, time.perf_counter() - start
+
+
+def factor(
+    n: int,
+    timeout: float | None = None,
+    max_iterations: int | None = None,
+    strategies: list[str] | None = None,
+) -> FactorResult:
+    """
+    Runs several factoring strategies in parallel processes. The first one
+    to find a factor wins and the others are terminated.
+
+    :param n: the number to factor, an odd composite
+    :param timeout: the time budget in seconds for all strategies together
+    :param max_iterations: the iteration budget of every strategy
+    :param strategies: the names of the strategies to run (default: all in STRATEGIES)
+    :return: the factors p <= q, the winning strategy and the elapsed time
+
+    >>> factor(1000001000000090000037000001961)[:3]
+    (1000000000000037, 1000001000000053, 'fermat')
+    >>> factor(3 * (2**89 - 1))[:2]
+    (3, 618970019642690137449562111)
+    >>> factor(2**61 - 1)
+    Traceback (most recent call last):
+    ...
+    ValueError: 2305843009213693951 is prime
+    >>> factor(1)
+    Traceback (most recent call last):
+    ...
+    ValueError: 1 is not a composite number
+    """
+    start = time.perf_counter()
+    if n < 4:
+        raise ValueError(f"{n} is not a composite number")
+    if is_prime(n):
+        raise ValueError(f"{n} is prime")
+    if n % 2 == 0:
+        return FactorResult(2, n // 2, "trial", time.perf_counter() - start)
+    if math.isqrt(n) ** 2 == n:
+        root = math.isqrt(n)
+        return FactorResult(root, root, "square", time.perf_counter() - start)
+
+    names = strategies or list(STRATEGIES)
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    results: queue.SimpleQueue = queue.SimpleQueue()
+
+    with Pool(len(names)) as pool:
+        for name in names:
+            pool.apply_async(
+                _run_strategy,
+                (name, n, deadline, max_iterations),
+                callback=results.put,
+                error_callback=results.put,
+            )
+
+        for _ in names:
+            try:
+                if deadline is None:
+                    result = results.get()
+                else:
+                    result = results.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                logger.info("Time budget of %s s used up", timeout)
+                break
+            if isinstance(result, Exception):
+                logger.error("Strategy failed: %s", result)
+                continue
+
+            name, p, seconds = result
+            if p is None:
+                logger.info("%s gave up after %.3f s", name, seconds)
+                continue
+            logger.info("%s found %d after %.3f s", name, p, seconds)
+            pool.terminate()
+            p, q = sorted((p, n // p))
+            return FactorResult(p, q, name, time.perf_counter() - start)
+
+        pool.terminate()
+
+    raise ValueError(f"No strategy found a factor of {n} within the budget")
+
+
+if __name__ == "__main__":
+    import doctest
+
+    doctest.testmod()
+
+    parser = argparse.ArgumentParser(
+        description="Factor a number with several strategies in parallel."
+    )
+    parser.add_argument("number", type=int, help="The number to factor")
+    parser.add_argument(
+        "-t", "--timeout", type=float, default=None, help="time budget in seconds"
+    )
+    parser.add_argument(
+        "-i",
+        "--iterations",
+        type=int,
+        default=None,
+        help="iteration budget of every strategy (default: unlimited)",
+    )
+    parser.add_argument(
+        "-s",
+        "--strategies",
+        nargs="+",
+        choices=list(STRATEGIES),
+        default=None,
+        help="strategies to run (default: all)",
+    )
+    parser.add_argument(
+        "-v", "--verbose", action="store_true", help="Enable verbose output"
+    )
+    args = parser.parse_args()
+
+    level = logging.INFO if args.verbose else logging.WARNING
+    logging.basicConfig(level=level, format="%(levelname)s: %(message)s")
+
+    try:
+        result = factor(args.number, args.timeout, args.iterations, args.strategies)
+        print(
+            f"Success! p = {result.p}, q = {result.q}, "
+            f"strategy = {result.strategy}, {result.seconds:.3f} s"
+        )
+    except ValueError as e:
+        print(f"Failed: {e}")
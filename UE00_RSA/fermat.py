@@ -1,22 +1,87 @@
 __author__ = "Karun Sandhu"
 
+import math
+from array import array
 from collections import Counter
 
+from UE00_RSA.small_primes import primes_below
 
-def fermat(p: int) -> Counter:
+# from this p on fermat() uses fermat_sieve() instead of one pow() per a
+SIEVE_THRESHOLD = 1 << 10
+
+
+def smallest_prime_factors(limit: int) -> array:
+    """
+    Sieves the smallest prime factor of every number below limit (0 and 1 map
+    to themselves). The primes are walked in descending order and every one
+    overwrites its multiples with a slice assignment, so the smallest prime is
+    written last.
+
+    :param limit: the exclusive upper bound, at most SMALL_PRIME_LIMIT ** 2
+    :return: an array with spf[a] for every a < limit
+
+    >>> smallest_prime_factors(16).tolist()
+    [0, 1, 2, 3, 2, 5, 2, 7, 2, 3, 2, 11, 2, 13, 2, 3]
+    """
+    spf = array("I", range(limit))
+    for q in reversed(primes_below(math.isqrt(max(limit - 1, 0)) + 1)):
+        spf[q * q :: q] = array("I", [q]) * len(range(q * q, limit, q))
+    return spf
+
+
+def fermat_sieve(p: int) -> array:
+    """
+    Computes a^(p - 1) mod p for every a < p without one exponentiation per a.
+
+    a -> a^(p - 1) mod p is completely multiplicative, so pow() is only needed
+    for prime a. Every composite a = q * m with q its smallest prime factor
+    takes the product of the already known values of q and m.
+
+    :param p: the number p, greater than 1 and below 2^32
+    :return: an array with a^(p - 1) mod p at index a (index 0 holds 0)
+
+    >>> fermat_sieve(9).tolist()
+    [0, 1, 4, 0, 7, 7, 0, 4, 1]
+    >>> fermat_sieve(561).tolist() == [pow(a, 560, 561) for a in range(561)]
+    True
+    """
+    if p < 2:
+        raise ValueError("p must be greater than 1")
+    spf = smallest_prime_factors(p)
+    values = array("I", bytes(4 * p))
+    values[1] = 1 % p
+    for a in range(2, p):
+        q = spf[a]
+        if q == a:
+            values[a] = pow(a, p - 1, p)
+        else:
+            values[a] = values[q] * values[a // q] % p
+    return values
+
+
+def fermat(p: int, sieve: bool | None = None) -> Counter:
     """
     Gets a Counter object with all fermat results of a number p.
 
     :param p: the number p
+    :param sieve: True to use fermat_sieve(), False for one pow() per a
+        (default: the sieve from SIEVE_THRESHOLD on)
     :return: the Counter object
 
     >>> c = fermat(9); c.most_common()
     [(1, 2), (4, 2), (0, 2), (7, 2)]
     >>> c = fermat(15); c.most_common()
     [(1, 4), (4, 4), (9, 2), (10, 2), (6, 2)]
+    >>> fermat(15, sieve=True) == fermat(15, sieve=False)
+    True
     """
     if p < 2:
         raise ValueError("p must be greater than 1")
+    if sieve is None:
+        sieve = p >= SIEVE_THRESHOLD
+    if sieve:
+        return Counter(fermat_sieve(p)[1:])
+
     fermat_list: list[int] = []
     for a in range(1, p):
         fermat_list.append(pow(a, p - 1, p))
@@ -0,0 +1,253 @@
+__author__ = "Karun Sandhu"
+
+import hashlib
+import hmac
+import logging
+import os
+import shutil
+import tempfile
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from random import SystemRandom
+from typing import BinaryIO, Callable, Iterator
+
+logger = logging.getLogger(__name__)
+
+# first bytes of a hybrid file. Block mode files have no header, is_hybrid()
+# also compares the length of the wrapped key with the key that is used, so a
+# block ciphertext is only mistaken for a hybrid one if its first 4 bytes are
+# MAGIC and bytes 7 and 8 happen to match that length.
+MAGIC = b"RSAH"
+VERSION = 1
+# RSA-KEM session key, SHAKE-256 keystream in counter mode, HMAC-SHA256 over header and ciphertext
+MODE_SHAKE256_HMAC = 1
+
+NONCE_BYTES = 16
+TAG_BYTES = hashlib.sha256().digest_size
+# bytes of keystream per counter value, files are processed in chunks of this size
+CHUNK_SIZE = 1 << 20
+
+
+def is_hybrid(src: BinaryIO, cipher_bytes: int | None = None) -> bool:
+    """
+    Checks whether a buffered stream starts with the hybrid header without
+    consuming it.
+
+    :param src: the buffered binary stream
+    :param cipher_bytes: the ciphertext block size of the key, if given the
+        header must announce a wrapped key of this length
+
+    >>> import io
+    >>> is_hybrid(io.BufferedReader(io.BytesIO(MAGIC + b"\\x01\\x01\\x01\\x00")))
+    True
+    >>> is_hybrid(io.BufferedReader(io.BytesIO(MAGIC + b"\\x01\\x01\\x01\\x00")), 128)
+    False
+    >>> is_hybrid(io.BufferedReader(io.BytesIO(b"\\x00\\x01")))
+    False
+    """
+    prefix = src.peek(len(MAGIC) + 4)[: len(MAGIC) + 4]
+    if prefix[: len(MAGIC)] != MAGIC:
+        return False
+    return cipher_bytes is None or prefix[-2:] == cipher_bytes.to_bytes(2, "big")
+
+
+def _derive_keys(secret: bytes, nonce: bytes) -> tuple[bytes, bytes]:
+    """
+    Derives the keystream key and the MAC key from the RSA-KEM secret.
+    """
+    material = hashlib.shake_256(b"RSAH keys" + nonce + secret).digest(64)
+    return material[:32], material[32:]
+
+
+def _xor_chunk(key: bytes, nonce: bytes, counter: int, data: bytes) -> bytes:
+    """
+    XORs data with the keystream block SHAKE-256(key || nonce || counter).
+
+    >>> chunk = _xor_chunk(b"k", b"n", 0, b"secret")
+    >>> chunk != b"secret", _xor_chunk(b"k", b"n", 0, chunk)
+    (True, b'secret')
+    """
+    stream = hashlib.shake_256(key + nonce + counter.to_bytes(8, "big")).digest(
+        len(data)
+    )
+    mixed = int.from_bytes(data, "little") ^ int.from_bytes(stream, "little")
+    return mixed.to_bytes(len(data), "little")
+
+
+def _read_chunks(
+    src: BinaryIO, keep: int = 0, tail: bytearray | None = None
+) -> Iterator[bytes]:
+    """
+    Yields CHUNK_SIZE sized chunks of src (the last one may be shorter). With
+    keep > 0 the last keep bytes of the stream are held back and stored in tail
+    instead of being yielded.
+    """
+    buffer = bytearray(CHUNK_SIZE + keep)
+    view = memoryview(buffer)
+    filled = 0
+    while True:
+        while filled < len(buffer):
+            read = src.readinto(view[filled:])
+            if not read:
+                break
+            filled += read
+
+        if filled < len(buffer):
+            if filled < keep:
+                raise ValueError("Truncated hybrid file")
+            if filled > keep:
+                yield bytes(view[: filled - keep])
+            if tail is not None:
+                tail[:] = view[filled - keep : filled]
+            return
+
+        yield bytes(view[:CHUNK_SIZE])
+        view[:keep] = view[CHUNK_SIZE:]
+        filled = keep
+
+
+def _xor_stream(
+    chunks: Iterator[bytes], key: bytes, nonce: bytes, jobs: int
+) -> Iterator[bytes]:
+    """
+    Applies the keystream to every chunk, with jobs > 1 in a process pool.
+    Results are yielded in input order.
+    """
+    if jobs == 1:
+        for counter, chunk in enumerate(chunks):
+            yield _xor_chunk(key, nonce, counter, chunk)
+        return
+
+    workers = jobs or os.cpu_count() or 1
+    pending: deque[Future[bytes]] = deque()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for counter, chunk in enumerate(chunks):
+            pending.append(executor.submit(_xor_chunk, key, nonce, counter, chunk))
+            while len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def encrypt_stream(
+    src: BinaryIO, dst: BinaryIO, public: tuple[int, ...], jobs: int = 1
+) -> int:
+    """
+    Encrypts src in hybrid mode. RSA only wraps a random value r < n (RSA-KEM),
+    the keystream and MAC keys are derived from r. Layout of the output:
+
+        MAGIC | version | mode | length of c (2 bytes) | c = r^e mod n | nonce | payload | tag
+
+    :param src: the binary stream to read from
+    :param dst: the binary stream to write to
+    :param public: the public key (e, n, bits)
+    :param jobs: the number of worker processes for the keystream, 0 for one per CPU
+    :return: the number of payload bytes
+
+    >>> import io
+    >>> public, private = (17, 3233, 12), (2753, 3233, 12, 61, 53, 53, 49, 38)
+    >>> encrypted = io.BytesIO()
+    >>> encrypt_stream(io.BytesIO(b"hello hybrid"), encrypted, public)
+    12
+    >>> decrypted = io.BytesIO()
+    >>> src = io.BufferedReader(io.BytesIO(encrypted.getvalue()))
+    >>> decrypt_stream(src, decrypted, lambda c: pow(c, 2753, 3233))
+    12
+    >>> decrypted.getvalue()
+    b'hello hybrid'
+    >>> tampered = bytearray(encrypted.getvalue())
+    >>> tampered[-TAG_BYTES - 1] ^= 1
+    >>> decrypted = io.BytesIO()
+    >>> src = io.BufferedReader(io.BytesIO(bytes(tampered)))
+    >>> decrypt_stream(src, decrypted, lambda c: pow(c, 2753, 3233))
+    Traceback (most recent call last):
+    ...
+    ValueError: Authentication failed, the file was corrupted or modified
+    >>> decrypted.getvalue()
+    b''
+    """
+    e, n = public[0], public[1]
+    cipher_bytes = (n.bit_length() + 7) // 8
+
+    r = SystemRandom().randrange(2, n)
+    secret = r.to_bytes(cipher_bytes, "big")
+    nonce = os.urandom(NONCE_BYTES)
+    key, mac_key = _derive_keys(secret, nonce)
+
+    header = (
+        MAGIC
+        + bytes([VERSION, MODE_SHAKE256_HMAC])
+        + cipher_bytes.to_bytes(2, "big")
+        + pow(r, e, n).to_bytes(cipher_bytes, "big")
+        + nonce
+    )
+    mac = hmac.new(mac_key, header, "sha256")
+    dst.write(header)
+
+    size = 0
+    for chunk in _xor_stream(_read_chunks(src), key, nonce, jobs):
+        mac.update(chunk)
+        dst.write(chunk)
+        size += len(chunk)
+
+    dst.write(mac.digest())
+    dst.flush()
+    return size
+
+
+def decrypt_stream(
+    src: BinaryIO, dst: BinaryIO, unwrap: Callable[[int], int], jobs: int = 1
+) -> int:
+    """
+    Decrypts a hybrid stream written by encrypt_stream().
+
+    The tag is only known at the end of the stream, so the payload is read
+    twice: once to check the MAC and, only if it matches, once to decrypt it.
+    Nothing is written to dst for a corrupted or modified file. A src that can
+    not seek, like stdin, is copied to a temporary file first.
+
+    :param src: the binary stream to read from
+    :param dst: the binary stream to write to
+    :param unwrap: the RSA private key operation, e.g. partial(decrypt_block, private=key)
+    :param jobs: the number of worker processes for the keystream, 0 for one per CPU
+    :return: the number of payload bytes
+    """
+    prefix = src.read(len(MAGIC) + 4)
+    if len(prefix) < len(MAGIC) + 4 or prefix[: len(MAGIC)] != MAGIC:
+        raise ValueError("Not a hybrid file")
+    version, mode = prefix[len(MAGIC)], prefix[len(MAGIC) + 1]
+    if version != VERSION or mode != MODE_SHAKE256_HMAC:
+        raise ValueError(f"Unsupported hybrid format version {version}, mode {mode}")
+
+    cipher_bytes = int.from_bytes(prefix[-2:], "big")
+    rest = src.read(cipher_bytes + NONCE_BYTES)
+    if len(rest) < cipher_bytes + NONCE_BYTES:
+        raise ValueError("Truncated hybrid file")
+    wrapped, nonce = rest[:cipher_bytes], rest[cipher_bytes:]
+
+    secret = unwrap(int.from_bytes(wrapped, "big")).to_bytes(cipher_bytes, "big")
+    key, mac_key = _derive_keys(secret, nonce)
+    mac = hmac.new(mac_key, prefix + rest, "sha256")
+
+    with tempfile.TemporaryFile() as spool:
+        if not src.seekable():
+            shutil.copyfileobj(src, spool, CHUNK_SIZE)
+            spool.seek(0)
+            src = spool
+        start = src.tell()
+
+        tag = bytearray()
+        for chunk in _read_chunks(src, TAG_BYTES, tag):
+            mac.update(chunk)
+        if not hmac.compare_digest(mac.digest(), tag):
+            raise ValueError(
+                "Authentication failed, the file was corrupted or modified"
+            )
+
+        src.seek(start)
+        size = 0
+        for chunk in _xor_stream(_read_chunks(src, TAG_BYTES), key, nonce, jobs):
+            dst.write(chunk)
+            size += len(chunk)
+    dst.flush()
+    return size
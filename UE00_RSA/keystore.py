@@ -0,0 +1,183 @@
+__author__ = "Karun Sandhu"
+
+import logging
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import NamedTuple
+
+logger = logging.getLogger(__name__)
+
+# first bytes of a binary key file, followed by version, kind and number of values
+MAGIC = b"RSAK"
+VERSION = 1
+PUBLIC, PRIVATE = 0, 1
+
+# id_rsa{bits}(.pub) files are looked up in this order
+KEY_SIZES = (4096, 2048, 1024, 512, 256, 128, 64, 32, 16, 8, 4, 2)
+
+# number of parsed keys kept by load_key()
+CACHE_SIZE = 32
+
+
+class KeyInfo(NamedTuple):
+    """
+    A parsed key together with the block sizes derived from its modulus.
+    """
+
+    path: str
+    key: tuple[int, ...]
+    private: bool
+    plain_bytes: int
+    cipher_bytes: int
+
+
+def encode_key(key: tuple[int, ...], private: bool) -> bytes:
+    """
+    Encodes a key in the binary key format: MAGIC, version, kind and the number
+    of values, followed by every value as a 4 byte length and its big endian
+    bytes. The bit length (key[2]) is not stored, it follows from n.
+
+    :param key: the key as returned by generate_keys()
+    :param private: True for a private key
+    :return: the encoded key
+
+    >>> encode_key((3, 33, 6), False)
+    b'RSAK\\x01\\x00\\x02\\x00\\x00\\x00\\x01\\x03\\x00\\x00\\x00\\x01!'
+    """
+    values = key[:2] + key[3:]
+    data = bytearray(MAGIC)
+    data += bytes([VERSION, PRIVATE if private else PUBLIC, len(values)])
+    for value in values:
+        raw = value.to_bytes((value.bit_length() + 7) // 8, "big")
+        data += len(raw).to_bytes(4, "big") + raw
+    return bytes(data)
+
+
+def decode_key(data: bytes) -> tuple[tuple[int, ...], bool | None]:
+    """
+    Decodes a binary or a text key file (one decimal value per line).
+
+    :param data: the content of the key file
+    :return: the key and whether it is a private key (None for text keys)
+
+    >>> decode_key(encode_key((2753, 3233, 12, 61, 53, 53, 49, 38), True))
+    ((2753, 3233, 12, 61, 53, 53, 49, 38), True)
+    >>> decode_key(b"17\\n3233")
+    ((17, 3233, 12), None)
+    """
+    if not data.startswith(MAGIC):
+        values = [int(line) for line in data.split() if line]
+        n = values[1]
+        return (values[0], n, n.bit_length(), *values[2:]), None
+
+    version, kind, count = data[len(MAGIC) : len(MAGIC) + 3]
+    if version != VERSION:
+        raise ValueError(f"Unsupported key format version {version}")
+
+    values = []
+    offset = len(MAGIC) + 3
+    for _ in range(count):
+        length = int.from_bytes(data[offset : offset + 4], "big")
+        offset += 4
+        values.append(int.from_bytes(data[offset : offset + length], "big"))
+        offset += length
+
+    n = values[1]
+    return (values[0], n, n.bit_length(), *values[2:]), kind == PRIVATE
+
+
+def write_key(
+    path: str, key: tuple[int, ...], private: bool, binary: bool = True
+) -> None:
+    """
+    Writes a key file in the binary or in the text format.
+
+    :param path: the path of the key file
+    :param key: the key as returned by generate_keys()
+    :param private: True for a private key
+    :param binary: False to write one decimal value per line
+    """
+    if binary:
+        Path(path).write_bytes(encode_key(key, private))
+    else:
+        Path(path).write_text("\n".join(str(i) for i in (key[:2] + key[3:])))
+
+
+_cache: OrderedDict[tuple[str, int], KeyInfo] = OrderedDict()
+
+
+def load_key(path: str, private: bool = False) -> KeyInfo:
+    """
+    Loads a key file. Parsed keys are kept in an LRU cache keyed by path and
+    modification time, so loading the same key again costs a single stat().
+
+    Text private keys with only d and n (written before the CRT parameters were
+    stored) are returned as (d, n, bits) and decrypt without CRT.
+
+    :param path: the path of the key file
+    :param private: True if a private key is expected
+    :return: the parsed key and its block sizes
+
+    >>> import tempfile
+    >>> path = os.path.join(tempfile.mkdtemp(), "id_rsa12")
+    >>> write_key(path, (2753, 3233, 12, 61, 53, 53, 49, 38), private=True)
+    >>> info = load_key(path, private=True)
+    >>> info.key[:2], info.plain_bytes, info.cipher_bytes
+    ((2753, 3233), 1, 2)
+    >>> load_key(path, private=True) is info
+    True
+    """
+    cache_key = (os.path.abspath(path), os.stat(path).st_mtime_ns)
+    if (info := _cache.get(cache_key)) is not None:
+        _cache.move_to_end(cache_key)
+        return info
+
+    with open(path, "rb") as f:
+        key, is_private = decode_key(f.read())
+    if is_private is not None and is_private != private:
+        raise ValueError(f"{path} is not a {'private' if private else 'public'} key")
+    if private and len(key) < 8:
+        logger.warning("%s has no CRT parameters, using slow decryption", path)
+
+    bits = key[2]
+    info = KeyInfo(path, key, private, (bits - 1) // 8, (bits + 7) // 8)
+
+    _cache[cache_key] = info
+    if len(_cache) > CACHE_SIZE:
+        _cache.popitem(last=False)
+    return info
+
+
+_found: dict[tuple[str, bool], str] = {}
+
+
+def find_key(private: bool) -> str:
+    """
+    Returns the first id_rsa{bits}.pub (or id_rsa{bits} for private keys) in
+    the current directory, trying the sizes in KEY_SIZES. The result is
+    remembered per directory and only checked again with one is_file().
+
+    :param private: True to look for a private key
+    :return: the path of the key file
+    """
+    suffix = "" if private else ".pub"
+    lookup = (os.getcwd(), private)
+    if (keyfile := _found.get(lookup)) is not None and Path(keyfile).is_file():
+        return keyfile
+
+    keyfile = next(
+        (
+            f"id_rsa{bits}{suffix}"
+            for bits in KEY_SIZES
+            if Path(f"id_rsa{bits}{suffix}").is_file()
+        ),
+        None,
+    )
+    if keyfile is None:
+        kind = "private" if private else "public"
+        logger.error("No %s key file found.", kind)
+        raise FileNotFoundError(f"No {kind} key file found.")
+
+    _found[lookup] = keyfile
+    return keyfile
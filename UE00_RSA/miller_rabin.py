@@ -1,14 +1,83 @@
 __author__ = "Karun Sandhu"
 
+import csv
+import math
 import random
+import time
+from itertools import chain
+from statistics import mean
+from typing import Iterable
 
-from UE00_RSA import PRIMES
+from UE00_RSA.small_primes import (
+    SMALL_PRIME_LIMIT,
+    is_small_prime,
+    primes_below,
+    primorial,
+)
+
+# candidates below this bit length are drawn one by one, above it whole windows are sieved
+SIEVE_MIN_BITS = 32
+# small primes up to this bound are used to sieve a window of candidates
+SIEVE_PRIME_LIMIT = 1 << 15
+# is_prime() trial divides by the primes below this bound (one gcd) before Miller–Rabin
+TRIAL_DIVISION_LIMIT = 1 << 10
+
+# Miller–Rabin with these bases is exact for every n below DETERMINISTIC_LIMIT
+DETERMINISTIC_BASES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
+DETERMINISTIC_LIMIT = 3_317_044_064_679_887_385_961_981
+
+# (minimum bit length, rounds) for random candidates, error probability <= 2^-100,
+# after the Damgård–Landrock–Pomerance bounds behind FIPS 186-5, Table B.1
+MILLER_RABIN_ROUNDS = (
+    (1536, 4),
+    (1024, 5),
+    (512, 7),
+    (256, 16),
+    (0, 40),
+)
+
+_rnd = random.SystemRandom()
+
+
+def _miller_rabin(n: int, bases: Iterable[int]) -> bool:
+    """
+    Runs one Miller–Rabin round per base.
+
+    :param n: odd integer greater than 3 to test for primality
+    :param bases: the bases to test, each in [2, n - 2]
+    :return: True if n is a strong probable prime to every base
+    """
+    d = n - 1
+    s = 0
+    while d % 2 == 0:
+        d //= 2
+        s += 1
+
+    for a in bases:
+        x = pow(a, d, n)
+
+        if x == 1 or x == n - 1:
+            continue
+
+        for _ in range(s - 1):
+            x = pow(x, 2, n)
+            if x == n - 1:
+                break
+            if x == 1:
+                return False
+        else:
+            return False
+
+    return True
 
 
 def is_prime_miller_rabin(n: int, k: int) -> bool:
     """
     Perform the Miller–Rabin probabilistic primality test.
 
+    The first round always uses base 2, which rejects almost every composite
+    cheaply, the remaining k - 1 rounds use random bases.
+
     :param n: odd integer greater than 3 to test for primality
     :param k: number of rounds to perform (higher = more confidence)
     :return: True if "probably prime", False if "composite"
@@ -23,6 +92,8 @@ def is_prime_miller_rabin(n: int, k: int) -> bool:
     True
     >>> is_prime_miller_rabin(10000, 8)  # even composite
     False
+    >>> is_prime_miller_rabin(2047, 1)  # 2047 = 23 * 89 fools base 2
+    True
     """
     if n <= 3:
         raise ValueError("n must be greater than 3")
@@ -30,39 +101,32 @@ def is_prime_miller_rabin(n: int, k: int) -> bool:
     if k <= 0:
         raise ValueError("k must be at least 1")
 
-    rnd = random.SystemRandom()
-
-    d = n - 1
-    s = 0
-    while d % 2 == 0:
-        d //= 2
-        s += 1
+    return _miller_rabin(n, chain((2,), (_rnd.randint(2, n - 2) for _ in range(k - 1))))
 
-    for _ in range(k):
-        a = rnd.randint(2, n - 2)
-        x = pow(a, d, n)
 
-        if x == 1 or x == n - 1:
-            continue
+def miller_rabin_rounds(bits: int) -> int:
+    """
+    Returns the number of Miller–Rabin rounds needed for a random candidate.
 
-        for _ in range(s - 1):
-            x = pow(x, 2, n)
-            if x == n - 1:
-                break
-            if x == 1:
-                return False
-        else:
-            return False
+    :param bits: the bit length of the candidate
+    :return: the number of rounds
 
-    return True
+    >>> miller_rabin_rounds(1024)
+    5
+    >>> miller_rabin_rounds(2048)
+    4
+    """
+    return next(rounds for min_bits, rounds in MILLER_RABIN_ROUNDS if bits >= min_bits)
 
 
 def is_prime(n: int) -> bool:
     """
     Determines whether a given number is prime.
 
-    This function first checks if the number is in a predefined list of small prime numbers (PRIMES).
-    If the number is not in the list, it uses the Miller-Rabin primality test to determine primality.
+    Numbers below SMALL_PRIME_LIMIT are looked up in the small prime sieve, larger ones are
+    first trial divided by the primes below TRIAL_DIVISION_LIMIT. Numbers below
+    DETERMINISTIC_LIMIT are tested with the fixed DETERMINISTIC_BASES, so the answer is
+    exact. Larger numbers get miller_rabin_rounds() random Miller-Rabin rounds.
 
     :param n: the number to check for primality.
     :return: True if the number is prime, False otherwise.
@@ -73,21 +137,91 @@ def is_prime(n: int) -> bool:
     False
     >>> is_prime(97)
     True
+    >>> is_prime(3_215_031_751)  # strong pseudoprime to the bases 2, 3, 5 and 7
+    False
+    >>> is_prime(2**89 - 1)
+    True
     """
-    if n <= PRIMES[-1]:
-        return n in PRIMES
-    else:
-        return is_prime_miller_rabin(n, k=200)
+    if n < 2:
+        return False
+    if n < SMALL_PRIME_LIMIT:
+        return is_small_prime(n)
+    if math.gcd(n, primorial(TRIAL_DIVISION_LIMIT)) != 1:
+        return False
+    if n < DETERMINISTIC_LIMIT:
+        return _miller_rabin(n, DETERMINISTIC_BASES)
+    return is_prime_miller_rabin(n, k=miller_rabin_rounds(n.bit_length()))
 
 
 def _get_candidate(bits: int) -> int:
-    rnd = random.SystemRandom()
-    candidate = rnd.getrandbits(bits)
+    candidate = _rnd.getrandbits(bits)
     candidate |= 1 << (bits - 1)
     candidate |= 1
     return candidate
 
 
+def _sieve_window(start: int, window: int, primes: Iterable[int]) -> bytearray:
+    """
+    Sieves the odd numbers start, start + 2, ..., start + 2 * (window - 1).
+
+    :param start: an odd number larger than every prime in primes
+    :param window: the number of candidates
+    :param primes: the odd primes to sieve with
+    :return: a bytearray with 1 at every offset that has a small prime factor
+
+    >>> list(_sieve_window(101, 8, [3, 5, 7]))
+    [0, 0, 1, 0, 0, 1, 0, 1]
+    """
+    composite = bytearray(window)
+    ones = b"\x01" * window
+    for p in primes:
+        # start + 2 * i = 0 (mod p)  <=>  i = -start * 2^-1 (mod p)
+        i = (-start * ((p + 1) // 2)) % p
+        if i < window:
+            composite[i::p] = ones[: (window - 1 - i) // p + 1]
+    return composite
+
+
+def _generate_prime_random(bits: int) -> tuple[int, int]:
+    """
+    Draws random candidates until one is prime.
+
+    :return: the prime and the number of candidates tested with is_prime()
+    """
+    tested = 1
+    candidate = _get_candidate(bits)
+    while not is_prime(candidate):
+        tested += 1
+        candidate = _get_candidate(bits)
+    return candidate, tested
+
+
+def _generate_prime_sieved(bits: int) -> tuple[int, int]:
+    """
+    Picks a random odd start and sieves a window of the following odd numbers
+    against the small primes. Only the survivors are tested with is_prime().
+
+    :return: the prime and the number of candidates tested with is_prime()
+    """
+    primes = primes_below(SIEVE_PRIME_LIMIT)[1:]
+    # about a dozen primes are expected in a window of 4 * bits odd numbers
+    window = 4 * bits
+
+    tested = 0
+    while True:
+        start = _get_candidate(bits)
+        composite = _sieve_window(start, window, primes)
+        i = composite.find(0)
+        while i != -1:
+            candidate = start + 2 * i
+            if candidate.bit_length() > bits:
+                break
+            tested += 1
+            if is_prime(candidate):
+                return candidate, tested
+            i = composite.find(0, i + 1)
+
+
 def generate_prime(bits: int) -> int:
     """
     Generates a prime number with a certain number of bits.
@@ -101,17 +235,74 @@ def generate_prime(bits: int) -> int:
     True
     >>> generate_prime(4) in [11, 13, 17, 19]
     True
+    >>> p = generate_prime(128)
+    >>> p.bit_length() == 128 and is_prime(p)
+    True
     """
     if bits < 2:
         raise ValueError("Number of bits must be at least 2")
 
-    candidate = _get_candidate(bits)
-    while not is_prime(candidate):
-        candidate = _get_candidate(bits)
-    return candidate
+    if bits < SIEVE_MIN_BITS:
+        return _generate_prime_random(bits)[0]
+    return _generate_prime_sieved(bits)[0]
+
+
+def benchmark_generate_prime_to_csv(
+    filename: str = "generate_prime_benchmark.csv",
+    bit_sizes: tuple[int, ...] = (256, 512, 1024, 2048),
+    runs: int = 5,
+) -> None:
+    """
+    Compares random candidates against the sieved candidate search.
+
+    :param filename: the csv file to write the results to
+    :param bit_sizes: the prime sizes in bits to benchmark
+    :param runs: the number of primes generated per method and size
+    """
+    with open(filename, "w", newline="") as csvfile:
+        fieldnames = [
+            "bits",
+            "random_tested",
+            "sieved_tested",
+            "random_time",
+            "sieved_time",
+            "speed_ratio",
+        ]
+        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+        writer.writeheader()
+
+        for bits in bit_sizes:
+            results = {}
+            for name, method in (
+                ("random", _generate_prime_random),
+                ("sieved", _generate_prime_sieved),
+            ):
+                tested, times = [], []
+                for _ in range(runs):
+                    start = time.perf_counter()
+                    tested.append(method(bits)[1])
+                    times.append(time.perf_counter() - start)
+                results[name] = (mean(tested), mean(times))
+
+            writer.writerow(
+                {
+                    "bits": bits,
+                    "random_tested": round(results["random"][0], 1),
+                    "sieved_tested": round(results["sieved"][0], 1),
+                    "random_time": round(results["random"][1], 6),
+                    "sieved_time": round(results["sieved"][1], 6),
+                    "speed_ratio": round(
+                        results["random"][1] / results["sieved"][1], 2
+                    ),
+                }
+            )
+
+    print(f"✅ Benchmark results written to {filename}")
 
 
 if __name__ == "__main__":
     import doctest
 
     doctest.testmod()
+
+    benchmark_generate_prime_to_csv()
@@ -4,16 +4,230 @@ import csv
 import json
 import math
 import timeit
-from math import gcd, isclose
+from math import isclose
 from pprint import pprint
+from typing import Iterable
 
 
-def my_pow(x: int, b: int, n: int | None = None) -> float:
+def _window_size(bits: int) -> int:
     """
-    Computes x raised to the power of b using recursion and exponentiation by squaring.
+    Returns the sliding window width for an exponent with the given number of
+    bits, trading the size of the odd-power table against saved multiplications.
+
+    >>> [_window_size(b) for b in (8, 64, 200, 600, 1500, 20_000)]
+    [1, 2, 3, 4, 5, 6]
+    """
+    for k, limit in ((1, 24), (2, 80), (3, 240), (4, 672), (5, 1792)):
+        if bits <= limit:
+            return k
+    return 6
+
+
+def _mod_inverse(x: int, n: int) -> int:
+    """
+    Computes the inverse of x modulo n with the extended Euclidean algorithm.
+
+    >>> _mod_inverse(3, 11)
+    4
+    """
+    old_r, r = x % n, n
+    old_s, s = 1, 0
+    while r:
+        q = old_r // r
+        old_r, r = r, old_r - q * r
+        old_s, s = s, old_s - q * s
+    if old_r != 1:
+        raise ValueError("No modular inverse exists for given base and modulus.")
+    return old_s % n
+
+
+def _decompose(b: int, k: int) -> list[tuple[int, int]]:
+    """
+    Splits the exponent b > 0 into sliding windows of at most k bits.
+
+    Every step is (squarings, index): square the result that many times, then
+    multiply it by the odd power table[index] (x^(2 * index + 1)). Index -1
+    means squarings only, used for trailing zero bits. The first step
+    initialises the result with its table entry and has no squarings.
+
+    >>> _decompose(0b1011001, 3)
+    [(0, 2), (1, 0), (3, 0)]
+    >>> _decompose(0b1000, 2)
+    [(0, 0), (3, -1)]
+    """
+    bits = bin(b)[2:]
+    steps = []
+    squarings = 0
+    i = 0
+    while i < len(bits):
+        if bits[i] == "0":
+            squarings += 1
+            i += 1
+            continue
+
+        # the window is bits i..end - 1, at most k bits wide and ending in a one
+        end = bits.rfind("1", i, i + k) + 1
+        steps.append((squarings + end - i if steps else 0, int(bits[i:end], 2) >> 1))
+        squarings = 0
+        i = end
+
+    if squarings:
+        steps.append((squarings, -1))
+    return steps
+
+
+def _odd_powers(x: int, count: int, n: int | None) -> list[int]:
+    """
+    Returns x, x^3, ..., x^(2 * count - 1), reduced modulo n if given.
+
+    >>> _odd_powers(2, 4, None)
+    [2, 8, 32, 128]
+    """
+    table = [x]
+    if count > 1:
+        x2 = x * x if n is None else x * x % n
+        for _ in range(count - 1):
+            table.append(table[-1] * x2 if n is None else table[-1] * x2 % n)
+    return table
+
+
+def _sliding_window_pow(x: int, b: int, n: int | None) -> int:
+    """
+    Left-to-right sliding window exponentiation for b > 0.
+
+    Only the odd powers x, x^3, ..., x^(2^k - 1) are precomputed. Zero bits cost
+    one squaring, every window of up to k bits ending in a one costs its
+    squarings plus a single multiplication by a table entry.
+    """
+    if n is not None:
+        x %= n
+    bits = bin(b)[2:]
+    k = _window_size(len(bits))
+
+    if k == 1:
+        # short exponents: plain square-and-multiply without a table
+        result = x
+        for bit in bits[1:]:
+            result = result * result if n is None else result * result % n
+            if bit == "1":
+                result = result * x if n is None else result * x % n
+        return result
+
+    steps = _decompose(b, k)
+    table = _odd_powers(x, 1 << (k - 1), n)
+
+    # the leading window initialises the result, so no squarings of 1 are done
+    result = table[steps[0][1]]
+    for squarings, index in steps[1:]:
+        for _ in range(squarings):
+            result = result * result if n is None else result * result % n
+        if index >= 0:
+            result = result * table[index] if n is None else result * table[index] % n
+    return result
+
+
+class PowPlan:
+    """
+    A precomputed plan for block^exponent mod modulus with a fixed exponent
+    and modulus, e.g. one key used for every block of a file.
+
+    The window decomposition of the exponent is done once, so applying the
+    plan only builds the small odd-power table of the block and multiplies.
+    Reductions use the plain % operator: in CPython it runs in C and measured
+    faster than Barrett or Montgomery reduction written in Python.
+
+    >>> plan = PowPlan(65537, 3233)
+    >>> plan.apply(65) == pow(65, 65537, 3233)
+    True
+    >>> plan.apply_many([0, 1, 2, 3232]) == [pow(m, 65537, 3233) for m in [0, 1, 2, 3232]]
+    True
+    >>> PowPlan(2753, 3233).apply(plan.apply(123)) == pow(123, 65537 * 2753, 3233)
+    True
+    """
+
+    def __init__(self, exponent: int, modulus: int) -> None:
+        """
+        :param exponent: the exponent, at least 1
+        :param modulus: the modulus, at least 2
+        """
+        if exponent < 1:
+            raise ValueError("exponent must be at least 1")
+        if modulus < 2:
+            raise ValueError("modulus must be at least 2")
+
+        self.exponent = exponent
+        self.modulus = modulus
+        self.window = _window_size(exponent.bit_length())
+        self.table_size = 1 << (self.window - 1)
+        self.steps = _decompose(exponent, self.window)
+
+    def __repr__(self) -> str:
+        return (
+            f"PowPlan(exponent bits={self.exponent.bit_length()}, "
+            f"modulus bits={self.modulus.bit_length()}, window={self.window}, "
+            f"steps={len(self.steps)})"
+        )
+
+    def multiplications(self) -> int:
+        """
+        Returns the number of modular multiplications (including squarings)
+        per block: the table, the squarings and one per window.
+
+        >>> PowPlan(65537, 3233).multiplications()
+        17
+        """
+        table = self.table_size if self.table_size > 1 else 0
+        return table + sum(s + (i >= 0) for s, i in self.steps[1:])
+
+    def apply(self, block: int) -> int:
+        """
+        Computes block^exponent mod modulus.
+
+        :param block: the base
+        :return: the result
+        """
+        n = self.modulus
+        table = _odd_powers(block % n, self.table_size, n)
+        result = table[self.steps[0][1]]
+        for squarings, index in self.steps[1:]:
+            for _ in range(squarings):
+                result = result * result % n
+            if index >= 0:
+                result = result * table[index] % n
+        return result
+
+    def apply_many(self, blocks: Iterable[int]) -> list[int]:
+        """
+        Computes block^exponent mod modulus for every block. The steps are
+        walked once for all blocks, so the interpreter overhead of the plan is
+        paid per step instead of per step and block.
+
+        :param blocks: the bases
+        :return: the results in the same order
+        """
+        n = self.modulus
+        tables = [_odd_powers(block % n, self.table_size, n) for block in blocks]
+        first = self.steps[0][1]
+        results = [table[first] for table in tables]
+        for squarings, index in self.steps[1:]:
+            for _ in range(squarings):
+                results = [r * r % n for r in results]
+            if index >= 0:
+                results = [r * t[index] % n for r, t in zip(results, tables)]
+        return results
+
+
+def my_pow(x: int, b: int, n: int | None = None) -> int | float:
+    """
+    Computes x raised to the power of b using iterative sliding window exponentiation.
+
+    The window width grows with the length of the exponent (see _window_size()),
+    so there is no recursion and far fewer multiplications than plain binary
+    exponentiation for long exponents.
 
     :param x: The base number.
     :param b: The exponent (can be a positive or negative integer).
+    :param n: The optional modulus. Negative exponents use the modular inverse.
     :return: The result of x raised to the power of b.
 
     >>> pow(2, 0)
@@ -26,25 +240,25 @@ def my_pow(x: int, b: int, n: int | None = None) -> float:
     81
     >>> pow(5, -2)
     0.04
+    >>> my_pow(2, 0), my_pow(2, 3), my_pow(2, -1), my_pow(3, 4), my_pow(5, -2)
+    (1, 8, 0.5, 81, 0.04)
+    >>> my_pow(3, 200, 17) == pow(3, 200, 17), my_pow(3, -5, 17) == pow(3, -5, 17)
+    (True, True)
+    >>> my_pow(7, 200_000) == 7**200_000
+    True
+    >>> my_pow(6, -1, 9)
+    Traceback (most recent call last):
+    ...
+    ValueError: No modular inverse exists for given base and modulus.
     """
     if b == 0:
         result = 1
     elif b < 0:
         if n is None:
-            result = 1 / my_pow(x, -b)
-        else:
-            if gcd(x, n) != 1:
-                raise ValueError(
-                    "No modular inverse exists for given base and modulus."
-                )
-            inv = my_pow(x, -1, n)
-            result = my_pow(int(inv), -b, n)
-    elif b % 2 == 0:
-        half_pow = my_pow(x, b // 2, n)
-        result = half_pow * half_pow
+            return 1 / my_pow(x, -b)
+        result = _sliding_window_pow(_mod_inverse(x, n), -b, n)
     else:
-        half_pow = my_pow(x, (b - 1) // 2, n)
-        result = half_pow * half_pow * x
+        result = _sliding_window_pow(x, b, n)
     return result % n if n is not None else result
 
 
@@ -70,6 +284,7 @@ def benchmark_to_csv(filename="benchmark_results.csv"):
         (5, 10_000, None),
         (7, 200_000, None),
         (3, 123_456, 17),
+        (3, -123_456, 17),
         (11, 1_000_000, None),
     ]
 
@@ -89,7 +304,7 @@ def benchmark_to_csv(filename="benchmark_results.csv"):
         for x, b, n in tests:
             expr = f"{x}^{b}" + (f" mod {n}" if n is not None else "")
 
-            builtin = pow(x, b, n) if n is not None and b >= 0 else pow(x, b)
+            builtin = pow(x, b, n) if n is not None else pow(x, b)
             custom = my_pow(x, b, n)
 
             # correctness check (allow float tolerance)
@@ -102,7 +317,7 @@ def benchmark_to_csv(filename="benchmark_results.csv"):
             # time both functions (5 runs each)
             my_time = timeit.timeit(lambda: my_pow(x, b, n), number=5)
             py_time = timeit.timeit(
-                lambda: pow(x, b, n) if n is not None and b >= 0 else pow(x, b),
+                lambda: pow(x, b, n) if n is not None else pow(x, b),
                 number=5,
             )
 
@@ -125,9 +340,68 @@ def benchmark_to_csv(filename="benchmark_results.csv"):
     print(f"✅ Benchmark results written to {filename}")
 
 
+def benchmark_plan_to_csv(
+    filename="benchmark_plan_results.csv", key_sizes=(1024, 2048), blocks=64
+):
+    """
+    Times a bulk job of random blocks with one exponent and modulus: pow() per
+    block against PowPlan.apply() and PowPlan.apply_many(). Both the public
+    exponent 65537 and a full size private exponent are measured.
+    """
+    from random import getrandbits, randrange
+
+    from UE00_RSA.miller_rabin import generate_prime
+
+    with open(filename, "w", newline="") as csvfile:
+        fieldnames = [
+            "bits",
+            "exponent",
+            "blocks",
+            "multiplications",
+            "pow_time",
+            "apply_time",
+            "apply_many_time",
+            "speed_ratio",
+        ]
+        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+        writer.writeheader()
+
+        for bits in key_sizes:
+            n = generate_prime(bits // 2) * generate_prime(bits - bits // 2)
+            data = [randrange(n) for _ in range(blocks)]
+
+            for name, exponent in (("e", 65537), ("d", getrandbits(bits) | 1)):
+                plan = PowPlan(exponent, n)
+                assert plan.apply_many(data) == [pow(m, exponent, n) for m in data]
+
+                pow_time = timeit.timeit(
+                    lambda: [pow(m, exponent, n) for m in data], number=3
+                )
+                apply_time = timeit.timeit(
+                    lambda: [plan.apply(m) for m in data], number=3
+                )
+                many_time = timeit.timeit(lambda: plan.apply_many(data), number=3)
+
+                writer.writerow(
+                    {
+                        "bits": bits,
+                        "exponent": name,
+                        "blocks": blocks,
+                        "multiplications": plan.multiplications(),
+                        "pow_time": round(pow_time, 6),
+                        "apply_time": round(apply_time, 6),
+                        "apply_many_time": round(many_time, 6),
+                        "speed_ratio": round(many_time / pow_time, 2),
+                    }
+                )
+
+    print(f"✅ Benchmark results written to {filename}")
+
+
 if __name__ == "__main__":
     import doctest
 
     doctest.testmod()
 
     benchmark_to_csv()
+    benchmark_plan_to_csv()
@@ -0,0 +1,159 @@
+__author__ = "Karun Sandhu"
+
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Iterable
+
+from UE00_RSA.miller_rabin import generate_prime
+
+logger = logging.getLogger(__name__)
+
+
+def _timed_generate_prime(bits: int) -> tuple[int, float]:
+    start = time.perf_counter()
+    prime = generate_prime(bits)
+    return prime, time.perf_counter() - start
+
+
+class PrimePool:
+    """
+    Keeps a number of primes per bit size ready so that key generation does not
+    have to wait for generate_prime(). Worker processes refill the pool in the
+    background every time a prime is taken out.
+
+    >>> with PrimePool([64], size=2, workers=1) as pool:
+    ...     _ = pool.wait_full()
+    ...     p = pool.get(64)
+    ...     q = pool.get(64)
+    ...     m = pool.metrics()
+    >>> p.bit_length(), q.bit_length(), p != q
+    (64, 64, True)
+    >>> m["hits"], m["misses"], m["hit_rate"]
+    (2, 0, 1.0)
+    """
+
+    def __init__(
+        self, bit_sizes: Iterable[int], size: int = 4, workers: int | None = None
+    ) -> None:
+        """
+        :param bit_sizes: the prime sizes in bits to keep ready
+        :param size: the number of primes kept per bit size
+        :param workers: the number of worker processes (default: one per CPU)
+        """
+        if size < 1:
+            raise ValueError("size must be at least 1")
+
+        self.size = size
+        self._executor = ProcessPoolExecutor(max_workers=workers)
+        self._lock = threading.Condition()
+        self._closed = False
+        self._primes: dict[int, deque[int]] = {bits: deque() for bits in bit_sizes}
+        self._pending: dict[int, int] = dict.fromkeys(self._primes, 0)
+
+        self._hits = 0
+        self._misses = 0
+        self._refills = 0
+        self._refill_time = 0.0
+
+        with self._lock:
+            for bits in self._primes:
+                self._refill(bits)
+
+    def __enter__(self) -> "PrimePool":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def _refill(self, bits: int) -> None:
+        """
+        Submits new jobs until available and pending primes reach the pool size.
+        Must be called with the lock held.
+        """
+        primes = self._primes[bits]
+        while not self._closed and len(primes) + self._pending[bits] < self.size:
+            self._pending[bits] += 1
+            future = self._executor.submit(_timed_generate_prime, bits)
+            future.add_done_callback(lambda f, bits=bits: self._on_ready(bits, f))
+
+    def _on_ready(self, bits: int, future: Future[tuple[int, float]]) -> None:
+        with self._lock:
+            self._pending[bits] -= 1
+            if future.cancelled() or self._closed:
+                return
+            if (error := future.exception()) is not None:
+                logger.error("Refilling %d-bit primes failed: %s", bits, error)
+                return
+
+            prime, elapsed = future.result()
+            self._primes[bits].append(prime)
+            self._refills += 1
+            self._refill_time += elapsed
+            self._lock.notify_all()
+
+    def get(self, bits: int) -> int:
+        """
+        Takes a prime out of the pool. If none is ready the prime is generated
+        in the calling process and the call counts as a miss.
+
+        :param bits: the number of bits of the prime
+        :return: a prime with the given number of bits
+        """
+        with self._lock:
+            if bits not in self._primes:
+                self._primes[bits] = deque()
+                self._pending[bits] = 0
+
+            primes = self._primes[bits]
+            prime = primes.popleft() if primes else None
+            if prime is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+            self._refill(bits)
+
+        if prime is None:
+            logger.debug("Prime pool miss for %d bits", bits)
+            prime = generate_prime(bits)
+        return prime
+
+    def wait_full(self, timeout: float | None = None) -> bool:
+        """
+        Blocks until every bit size has size primes ready.
+
+        :param timeout: the maximum number of seconds to wait
+        :return: True if the pool is full
+        """
+        with self._lock:
+            return self._lock.wait_for(
+                lambda: all(len(p) >= self.size for p in self._primes.values()),
+                timeout,
+            )
+
+    def metrics(self) -> dict[str, float | int | dict[int, int]]:
+        """
+        Returns the hit rate and refill statistics of the pool.
+        """
+        with self._lock:
+            requests = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / requests if requests else 0.0,
+                "refills": self._refills,
+                "mean_refill_time": (
+                    self._refill_time / self._refills if self._refills else 0.0
+                ),
+                "available": {bits: len(p) for bits, p in self._primes.items()},
+            }
+
+    def close(self) -> None:
+        """
+        Stops refilling and shuts the worker processes down.
+        """
+        with self._lock:
+            self._closed = True
+        self._executor.shutdown(wait=True, cancel_futures=True)
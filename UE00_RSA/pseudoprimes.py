@@ -0,0 +1,305 @@
+__author__ = "Karun Sandhu"
+
+import argparse
+import contextlib
+import logging
+import math
+import sys
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import cache
+from itertools import compress
+from typing import Iterator
+
+from UE00_RSA.fermat import smallest_prime_factors
+from UE00_RSA.small_primes import SMALL_PRIME_LIMIT, prime_segment, primes_below
+
+logger = logging.getLogger(__name__)
+
+# largest primes whose products are enumerated directly. No Wieferich prime
+# (1093, 3511) is this small, so these pseudoprimes are all squarefree.
+SMOOTH_LIMIT = 100
+# up to here the order of 2 is computed by factoring P - 1 with a sieve
+ORDER_LIMIT = SMALL_PRIME_LIMIT
+# width of the prime segments above ORDER_LIMIT
+SEGMENT_SIZE = 1 << 20
+# number of tasks the primes below ORDER_LIMIT are spread over
+DIRECT_TASKS = 16
+# the largest supported scan limit, orders below MAX_LIMIT // ORDER_LIMIT are factored with the sieve
+MAX_LIMIT = ORDER_LIMIT * ORDER_LIMIT
+
+
+def factorize(n: int) -> list[int]:
+    """
+    Returns the prime factors of n (with multiplicity) by trial division.
+
+    :param n: a number below MAX_LIMIT
+
+    >>> factorize(561), factorize(1194649)
+    ([3, 11, 17], [1093, 1093])
+    """
+    factors = []
+    for q in primes_below(math.isqrt(n) + 1):
+        while n % q == 0:
+            factors.append(q)
+            n //= q
+        if q * q > n:
+            break
+    if n > 1:
+        factors.append(n)
+    return factors
+
+
+def is_fermat_pseudoprime(n: int, base: int = 2) -> bool:
+    """
+    Checks whether n is a composite number with base^(n - 1) = 1 mod n.
+
+    >>> [n for n in range(2, 2000) if is_fermat_pseudoprime(n)]
+    [341, 561, 645, 1105, 1387, 1729, 1905]
+    """
+    return n > 3 and pow(base, n - 1, n) == 1 and factorize(n) != [n]
+
+
+def is_carmichael(n: int) -> bool:
+    """
+    Checks Korselt's criterion: n is composite and squarefree, and p - 1
+    divides n - 1 for every prime factor p of n.
+
+    >>> [n for n in range(2, 10_000) if is_carmichael(n)]
+    [561, 1105, 1729, 2465, 2821, 6601, 8911]
+    """
+    factors = factorize(n) if n > 1 else [n]
+    return (
+        len(factors) > 1
+        and len(set(factors)) == len(factors)
+        and all((n - 1) % (p - 1) == 0 for p in factors)
+    )
+
+
+@cache
+def _order_sieve() -> array:
+    return smallest_prime_factors(ORDER_LIMIT)
+
+
+def _order_of_two(p: int) -> int:
+    """
+    Returns the multiplicative order of 2 modulo the odd prime p < ORDER_LIMIT.
+
+    >>> _order_of_two(7), _order_of_two(11), _order_of_two(1093)
+    (3, 10, 364)
+    """
+    spf = _order_sieve()
+    order = m = p - 1
+    while m > 1:
+        q = spf[m]
+        while m % q == 0:
+            m //= q
+        while order % q == 0 and pow(2, order // q, p) == 1:
+            order //= q
+    return order
+
+
+def _check(n: int, largest: int, found: list[tuple[int, bool]]) -> None:
+    """
+    Records n if it is a base 2 pseudoprime whose largest prime factor is
+    largest, so every pseudoprime is found by exactly one prime.
+    """
+    if pow(2, n - 1, n) != 1:
+        return
+    factors = factorize(n)
+    if factors[-1] != largest:
+        return
+    squarefree = len(set(factors)) == len(factors)
+    found.append((n, squarefree and all((n - 1) % (p - 1) == 0 for p in factors)))
+
+
+def _scan_progression(p: int, order: int, limit: int, found: list) -> None:
+    """
+    Checks every n = p * k <= limit with k = 1 mod order and k > 1 odd. These
+    are the only candidates, 2^(n - 1) = 1 mod p needs order | n - 1 and p = 1
+    mod order.
+    """
+    step = order if order % 2 == 0 else 2 * order
+    for n in range(p * (1 + step), limit + 1, p * step):
+        _check(n, p, found)
+
+
+def _scan_smooth(limit: int) -> list[tuple[int, bool]]:
+    """
+    Checks every squarefree odd product of at least two primes up to
+    SMOOTH_LIMIT. Their progressions would be too dense to walk.
+    """
+    primes = [q for q in primes_below(SMOOTH_LIMIT + 1) if q > 2]
+    found: list[tuple[int, bool]] = []
+
+    def extend(start: int, product: int, count: int) -> None:
+        for i in range(start, len(primes)):
+            n = product * primes[i]
+            if n > limit:
+                break
+            if count:
+                _check(n, primes[i], found)
+            extend(i + 1, n, count + 1)
+
+    extend(0, 1, 0)
+    return found
+
+
+def _scan_direct(limit: int, index: int, tasks: int) -> list[tuple[int, bool]]:
+    """
+    Walks the progressions of every tasks-th prime between SMOOTH_LIMIT and
+    ORDER_LIMIT, starting with the index-th one. Small primes have the longest
+    progressions, interleaving keeps the tasks about equally long.
+    """
+    found: list[tuple[int, bool]] = []
+    primes = primes_below(min(ORDER_LIMIT, limit // 3 + 1))
+    start = len(primes_below(SMOOTH_LIMIT + 1))
+    for p in primes[start:][index::tasks]:
+        order = _order_of_two(p)
+        if p * (order + 1) <= limit:
+            _scan_progression(p, order, limit, found)
+    return found
+
+
+def _has_order(p: int, order: int) -> bool:
+    """
+    Checks that 2 has exactly the given order modulo p.
+    """
+    if pow(2, order, p) != 1:
+        return False
+    spf = _order_sieve()
+    m = order
+    while m > 1:
+        q = spf[m]
+        if pow(2, order // q, p) == 1:
+            return False
+        while m % q == 0:
+            m //= q
+    return True
+
+
+def _scan_segment(limit: int, lo: int, hi: int) -> list[tuple[int, bool]]:
+    """
+    Finds the pseudoprimes whose largest prime factor p lies in [lo, hi) with
+    lo >= ORDER_LIMIT. Then n = p * k needs order(p) < k <= limit / p, so only
+    the small orders are possible: for every order d the primes p = 1 mod d
+    below 2^d are taken from a segmented sieve and tested with pow().
+    """
+    found: list[tuple[int, bool]] = []
+    sieve = prime_segment(lo, hi)
+    for d in range(2, limit // lo):
+        top = min(hi - 1, limit // (d + 1), (1 << d) - 1)
+        if top < lo:
+            continue
+        step = d if d % 2 == 0 else 2 * d
+        first = lo + (1 - lo) % step
+        for p in compress(
+            range(first, top + 1, step), sieve[first - lo : top + 1 - lo : step]
+        ):
+            if _has_order(p, d):
+                _scan_progression(p, d, limit, found)
+    return found
+
+
+def _tasks(limit: int) -> list[tuple]:
+    """
+    Splits a scan up to limit into independent tasks.
+    """
+    tasks: list[tuple] = [(_scan_smooth, limit)]
+    tasks += [(_scan_direct, limit, i, DIRECT_TASKS) for i in range(DIRECT_TASKS)]
+    # modulo p >= ORDER_LIMIT the order of 2 has more bits than ORDER_LIMIT - 1
+    top = limit // (ORDER_LIMIT.bit_length() + 1)
+    for lo in range(ORDER_LIMIT, top + 1, SEGMENT_SIZE):
+        tasks.append((_scan_segment, limit, lo, min(lo + SEGMENT_SIZE, top + 1)))
+    return tasks
+
+
+def _run(task: tuple) -> list[tuple[int, bool]]:
+    func, *args = task
+    return func(*args)
+
+
+def scan(limit: int, jobs: int = 1) -> Iterator[list[tuple[int, bool]]]:
+    """
+    Finds every base 2 Fermat pseudoprime up to limit and marks the
+    Carmichael numbers among them.
+
+    Every pseudoprime n = p * k with p its largest prime factor needs the
+    order of 2 modulo p to divide k - 1, so only one residue class of k has to
+    be tested per prime instead of every number. The tasks are independent and
+    run in a process pool, their results are yielded as soon as a task is done.
+
+    :param limit: the largest number to check, at most MAX_LIMIT
+    :param jobs: the number of worker processes, 0 for one per CPU
+    :return: the (n, is Carmichael) pairs of every finished task, sorted per task
+
+    >>> found = sorted(n for part in scan(10_000) for n in part)
+    >>> len(found), found[:4]
+    (22, [(341, False), (561, True), (645, False), (1105, True)])
+    >>> [n for n, carmichael in found if carmichael]
+    [561, 1105, 1729, 2465, 2821, 6601, 8911]
+    """
+    if not 1 <= limit <= MAX_LIMIT:
+        raise ValueError(f"limit must be in [1, {MAX_LIMIT}]")
+
+    tasks = _tasks(limit)
+    logger.info("Scanning up to %d in %d tasks", limit, len(tasks))
+    if jobs == 1:
+        for task in tasks:
+            yield sorted(_run(task))
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs or None) as executor:
+        for future in as_completed([executor.submit(_run, task) for task in tasks]):
+            yield sorted(future.result())
+
+
+if __name__ == "__main__":
+    import doctest
+
+    doctest.testmod()
+
+    parser = argparse.ArgumentParser(
+        description="Find base 2 Fermat pseudoprimes and Carmichael numbers."
+    )
+    parser.add_argument("limit", type=int, help="The largest number to check")
+    parser.add_argument(
+        "-o", "--output", help="file to write every result to while scanning"
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=0,
+        help="number of worker processes, 0 for one per CPU (default: 0)",
+    )
+    parser.add_argument(
+        "-c", "--carmichael", action="store_true", help="only report Carmichael numbers"
+    )
+    parser.add_argument(
+        "-v", "--verbose", action="store_true", help="Enable verbose output"
+    )
+    args = parser.parse_args()
+
+    level = logging.INFO if args.verbose else logging.WARNING
+    logging.basicConfig(level=level, format="%(levelname)s: %(message)s")
+
+    start = time.perf_counter()
+    pseudoprimes = carmichaels = 0
+    output = (
+        open(args.output, "w") if args.output else contextlib.nullcontext(sys.stdout)
+    )
+    with output as f:
+        for part in scan(args.limit, args.jobs):
+            for n, carmichael in part:
+                pseudoprimes += 1
+                carmichaels += carmichael
+                if carmichael or not args.carmichael:
+                    f.write(f"{n} {'carmichael' if carmichael else 'pseudoprime'}\n")
+            f.flush()
+
+    print(
+        f"{pseudoprimes} pseudoprimes, {carmichaels} Carmichael numbers "
+        f"up to {args.limit} in {time.perf_counter() - start:.3f} s"
+    )
@@ -2,29 +2,68 @@ __author__ = "Karun Sandhu"
 
 
 import argparse
+import csv
+import io
 import logging
 import math
-from pathlib import Path
+import os
+import sys
+import time
+import timeit
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import partial
 from random import SystemRandom
-from typing import Generator
+from typing import BinaryIO, Callable, Generator, Iterator
 
+from UE00_RSA import hybrid
+from UE00_RSA.keystore import find_key, load_key, write_key
 from UE00_RSA.miller_rabin import generate_prime
+from UE00_RSA.prime_pool import PrimePool
 
 logger = logging.getLogger()
 
+# number of input bytes encrypted/decrypted per read, rounded down to whole blocks
+BUFFER_SIZE = 1 << 20
+# number of blocks handed to a worker process at once with --jobs
+CHUNK_BLOCKS = 256
+
+# public exponent of the "standard" key profile
+PUBLIC_EXPONENT = 65537
+# "standard" uses e = PUBLIC_EXPONENT, "legacy" a random e in [phi**2, phi**8]
+KEY_PROFILES = ("standard", "legacy")
+
+# "block" encrypts every block with RSA, "hybrid" only wraps a session key (see hybrid.py)
+ENCRYPTION_MODES = ("block", "hybrid")
+
 
 def generate_keys(
     number_of_bits: int,
-) -> tuple[tuple[int, int, int], tuple[int, int, int]]:
+    pool: PrimePool | None = None,
+    profile: str = "standard",
+) -> tuple[tuple[int, int, int], tuple[int, ...]]:
     """
     Generates a pair of RSA keys.
 
+    The private key keeps the primes and the CRT exponents so that decryption
+    can be done with the Chinese Remainder Theorem (see decrypt_block()).
+
+    The "standard" profile uses e = PUBLIC_EXPONENT and redraws every prime p
+    with gcd(e, p - 1) != 1. The "legacy" profile draws e uniformly from
+    [phi**2, phi**8], which makes encryption about 8x slower than decryption.
+
     :param number_of_bits: The desired bit length of the modulus n.
-    :return: A tuple containing the public key (e, n, number_of_bits) and the private key (d, n, number_of_bits).
+    :param pool: A PrimePool to take the primes from instead of generating them.
+    :param profile: The key profile, one of KEY_PROFILES.
+    :return: A tuple containing the public key (e, n, number_of_bits) and the private key
+             (d, n, number_of_bits, p, q, dp, dq, q_inv).
 
     >>> public, private = generate_keys(256)
     >>> e, n, _ = public
-    >>> d, _, _ = private
+    >>> d, _, _, p, q, dp, dq, q_inv = private
+    >>> p * q == n and dp == d % (p - 1) and dq == d % (q - 1) and q * q_inv % p == 1
+    True
     >>> test_values = [
     ...     0,
     ...     1,
@@ -39,24 +78,85 @@ def generate_keys(
     ...     c = pow(x, e, n)
     ...     y = pow(c, d, n)
     ...     assert x == y, f"Round‑trip failed for {x}"
+    ...     assert decrypt_block(c, private) == x, f"CRT round‑trip failed for {x}"
+
+    >>> public[0]
+    65537
+    >>> (e, n, _), private = generate_keys(256, profile="legacy")
+    >>> e.bit_length() > 2 * n.bit_length(), decrypt_block(pow(42, e, n), private)
+    (True, 42)
+
+    >>> with PrimePool([64], size=2, workers=1) as pool:
+    ...     _ = pool.wait_full()
+    ...     (e, n, _), private = generate_keys(128, pool)
+    >>> n.bit_length(), decrypt_block(pow(42, e, n), private)
+    (128, 42)
     """
+    if profile not in KEY_PROFILES:
+        raise ValueError(f"Unknown key profile {profile!r}")
+
+    draw_prime = pool.get if pool is not None else generate_prime
+
+    def get_prime(bits: int) -> int:
+        prime = draw_prime(bits)
+        # e is prime, so gcd(e, prime - 1) != 1 only if prime = 1 (mod e)
+        while profile == "standard" and prime % PUBLIC_EXPONENT == 1:
+            prime = draw_prime(bits)
+        return prime
+
     while True:
-        p = generate_prime(number_of_bits // 2)
-        q = generate_prime(number_of_bits // 2)
-        n = p * q
-        if p != q and n.bit_length() >= number_of_bits:
+        # both primes are drawn again, keeping one would favour large primes
+        p = get_prime(number_of_bits // 2)
+        q = get_prime(number_of_bits // 2)
+        if p != q and (p * q).bit_length() == number_of_bits:
             break
+    n = p * q
 
     phi = (p - 1) * (q - 1)
 
-    while True:
-        e = SystemRandom().randint(phi**2, phi**8)
-        if math.gcd(e, phi) == 1:
-            break
+    if profile == "standard":
+        e = PUBLIC_EXPONENT
+    else:
+        while True:
+            e = SystemRandom().randint(phi**2, phi**8)
+            if math.gcd(e, phi) == 1:
+                break
 
     d = pow(e, -1, phi)
 
-    return (e, n, number_of_bits), (d, n, number_of_bits)
+    dp = d % (p - 1)
+    dq = d % (q - 1)
+    q_inv = pow(q, -1, p)
+
+    return (e, n, number_of_bits), (d, n, number_of_bits, p, q, dp, dq, q_inv)
+
+
+def decrypt_block(block: int, private: tuple[int, ...]) -> int:
+    """
+    Decrypts a single block with the private key.
+
+    If the key carries its CRT parameters (p, q, dp, dq, q_inv) the two half-size
+    exponentiations are recombined with Garner's formula, otherwise (old two-line
+    key files) it falls back to pow(block, d, n).
+
+    :param block: the encrypted block
+    :param private: the private key (d, n, bits) or (d, n, bits, p, q, dp, dq, q_inv)
+    :return: the decrypted block
+
+    >>> decrypt_block(2790, (2753, 3233, 12, 61, 53, 53, 49, 38))
+    65
+    >>> decrypt_block(2790, (2753, 3233, 12))
+    65
+    """
+    if len(private) < 8:
+        d, n = private[0], private[1]
+        return pow(block, d, n)
+
+    p, q, dp, dq, q_inv = private[3:8]
+    m1 = pow(block, dp, p)
+    m2 = pow(block, dq, q)
+    h = q_inv * (m1 - m2) % p
+    return m2 + h * q
 
 
 def file2ints(filename: str, number_of_bytes: int) -> Generator[int]:
@@ -85,105 +185,518 @@ def ints2file(ints: list[int], filename: str, number_of_bytes: int) -> None:
     logger.info("Wrote %d blocks to %s", len(ints), filename)
 
 
-def save_keys(key_length: int) -> None:
+def save_keys(key_length: int, profile: str = "standard", binary: bool = True) -> None:
     """
-    Saves the public and private keys to files named 'public.key' and 'private.key
+    Saves the public and private keys to files named 'id_rsa{key_length}.pub' and 'id_rsa{key_length}'
+    :param binary: write the binary key format instead of one decimal value per line
     """
-    logger.info("Generating %d-bit RSA keys...", key_length)
-    public, private = generate_keys(key_length)
+    logger.info("Generating %d-bit RSA keys (%s profile)...", key_length, profile)
+    public, private = generate_keys(key_length, profile=profile)
     logger.debug("Public key: %s", public)
     logger.debug("Private key: %s", private)
 
     pub_file = f"id_rsa{key_length}.pub"
     priv_file = f"id_rsa{key_length}"
 
-    with open(pub_file, "w") as f:
-        f.write(f"{public[0]}\n{public[1]}")
-        logger.info("Saved public key to %s", pub_file)
+    write_key(pub_file, public, private=False, binary=binary)
+    logger.info("Saved public key to %s", pub_file)
+
+    write_key(priv_file, private, private=True, binary=binary)
+    logger.info("Saved private key to %s", priv_file)
+
+
+def _fill(f: BinaryIO, view: memoryview) -> int:
+    """
+    Reads from f until view is full or the end of the stream is reached. Pipes
+    may return short reads, which would otherwise shift the block boundaries.
+    """
+    filled = 0
+    while filled < len(view):
+        read = f.readinto(view[filled:])
+        if not read:
+            break
+        filled += read
+    return filled
+
+
+def _transform_blocks(
+    in_view: memoryview,
+    filled: int,
+    out_buffer: bytearray,
+    in_bytes: int,
+    out_bytes: int,
+    transform: Callable[[int], int],
+) -> int:
+    """
+    Transforms the first filled bytes of in_view into out_buffer.
+
+    :return: the number of bytes written to out_buffer
+    """
+    out = 0
+    for i in range(0, filled, in_bytes):
+        block = int.from_bytes(in_view[i : min(i + in_bytes, filled)], "big")
+        out_buffer[out : out + out_bytes] = transform(block).to_bytes(out_bytes, "big")
+        out += out_bytes
+    return out
+
+
+# the transform of a worker process, set once per worker by _init_worker()
+_worker_transform: Callable[[int], int] | None = None
+
+
+def _init_worker(transform: Callable[[int], int]) -> None:
+    global _worker_transform
+    _worker_transform = transform
+
 
-    with open(priv_file, "w") as f:
-        f.write(f"{private[0]}\n{private[1]}")
-        logger.info("Saved private key to %s", priv_file)
+def _transform_chunk(data: bytes, in_bytes: int, out_bytes: int) -> bytearray:
+    assert _worker_transform is not None
+    out_buffer = bytearray(-(-len(data) // in_bytes) * out_bytes)
+    _transform_blocks(
+        memoryview(data), len(data), out_buffer, in_bytes, out_bytes, _worker_transform
+    )
+    return out_buffer
+
+
+def transform_stream(
+    src: BinaryIO,
+    dst: BinaryIO,
+    in_bytes: int,
+    out_bytes: int,
+    transform: Callable[[int], int],
+    buffer_size: int = BUFFER_SIZE,
+    jobs: int = 1,
+) -> int:
+    """
+    Streams src to dst block by block. Every in_bytes block is read as a big
+    endian integer, passed through transform and written as out_bytes bytes.
+
+    Input is read with readinto() into one reusable buffer of about buffer_size
+    bytes and every buffer is written with a single write(), so memory use does
+    not depend on the size of the input.
+
+    With jobs > 1 the blocks are handed to a process pool in chunks of
+    CHUNK_BLOCKS blocks. transform is sent to every worker once, so it has to be
+    picklable (e.g. a functools.partial, not a lambda). At most two chunks per
+    worker are in flight and results are written in input order.
+
+    :param src: the binary stream to read from
+    :param dst: the binary stream to write to
+    :param in_bytes: the number of bytes per input block
+    :param out_bytes: the number of bytes per output block
+    :param transform: the function applied to every block
+    :param buffer_size: the approximate number of input bytes per buffer
+    :param jobs: the number of worker processes, 0 for one per CPU
+    :return: the number of blocks written
+
+    >>> import io
+    >>> dst = io.BytesIO()
+    >>> transform_stream(io.BytesIO(b"abcde"), dst, 2, 3, lambda x: x + 1, 4)
+    3
+    >>> dst.getvalue()
+    b'\\x00ac\\x00ce\\x00\\x00f'
+    >>> from functools import partial
+    >>> data = bytes(range(256)) * 20
+    >>> serial, parallel = io.BytesIO(), io.BytesIO()
+    >>> square = partial(pow, exp=2, mod=65521)
+    >>> transform_stream(io.BytesIO(data), serial, 2, 2, square)
+    2560
+    >>> transform_stream(io.BytesIO(data), parallel, 2, 2, square, jobs=2)
+    2560
+    >>> serial.getvalue() == parallel.getvalue()
+    True
+    """
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+    if jobs > 1:
+        return _transform_stream_parallel(
+            src, dst, in_bytes, out_bytes, transform, jobs
+        )
 
+    blocks_per_buffer = max(1, buffer_size // in_bytes)
+    in_buffer = bytearray(blocks_per_buffer * in_bytes)
+    out_buffer = bytearray(blocks_per_buffer * out_bytes)
+    in_view = memoryview(in_buffer)
+    out_view = memoryview(out_buffer)
 
-def encrypt_file(filename: str) -> None:
+    blocks = 0
+    while filled := _fill(src, in_view):
+        out = _transform_blocks(
+            in_view, filled, out_buffer, in_bytes, out_bytes, transform
+        )
+        dst.write(out_view[:out])
+        blocks += out // out_bytes
+
+    dst.flush()
+    return blocks
+
+
+def _transform_stream_parallel(
+    src: BinaryIO,
+    dst: BinaryIO,
+    in_bytes: int,
+    out_bytes: int,
+    transform: Callable[[int], int],
+    jobs: int,
+) -> int:
+    in_buffer = bytearray(CHUNK_BLOCKS * in_bytes)
+    in_view = memoryview(in_buffer)
+    pending: deque[Future[bytearray]] = deque()
+
+    blocks = 0
+    with ProcessPoolExecutor(
+        max_workers=jobs, initializer=_init_worker, initargs=(transform,)
+    ) as executor:
+        while filled := _fill(src, in_view):
+            pending.append(
+                executor.submit(
+                    _transform_chunk, bytes(in_view[:filled]), in_bytes, out_bytes
+                )
+            )
+            while len(pending) >= 2 * jobs:
+                blocks += _write_result(dst, pending.popleft(), out_bytes)
+
+        while pending:
+            blocks += _write_result(dst, pending.popleft(), out_bytes)
+
+    dst.flush()
+    return blocks
+
+
+def _write_result(dst: BinaryIO, future: Future[bytearray], out_bytes: int) -> int:
+    result = future.result()
+    dst.write(result)
+    return len(result) // out_bytes
+
+
+@contextmanager
+def _open_stream(filename: str, mode: str) -> Iterator[BinaryIO]:
+    """
+    Opens a file in binary mode, "-" stands for stdin or stdout.
+    """
+    if filename == "-":
+        yield sys.stdin.buffer if "r" in mode else sys.stdout.buffer
+    else:
+        with open(filename, mode) as f:
+            yield f
+
+
+def encrypt_file(
+    filename: str, output: str | None = None, jobs: int = 1, mode: str = "block"
+) -> None:
     """
     Encrypts a file with the first file it finds named id_rsa*.pub
-    :param filename: The path to the file to encrypt
+    :param filename: The path to the file to encrypt, "-" for stdin
+    :param output: The path to write to, "-" for stdout (default: filename.enc)
+    :param jobs: The number of worker processes, 0 for one per CPU
+    :param mode: One of ENCRYPTION_MODES
     """
+    if mode not in ENCRYPTION_MODES:
+        raise ValueError(f"Unknown encryption mode {mode!r}")
+    if output is None:
+        output = "-" if filename == "-" else f"{filename}.enc"
     logger.info("Encrypting file: %s", filename)
 
-    keyfile = next(
-        (
-            f"id_rsa{bits}.pub"
-            for bits in (2048, 1024, 512, 256, 128, 64, 32, 16, 8, 4, 2)
-            if Path(f"id_rsa{bits}.pub").is_file()
-        ),
-        None,
-    )
-    if keyfile is None:
-        logger.error("No public key file found.")
-        raise FileNotFoundError("No public key file found.")
-
-    with open(keyfile, "r") as f:
-        e = int(f.readline().strip())
-        n = int(f.readline().strip())
-        number_of_bits = n.bit_length()
+    keyfile = find_key(private=False)
+    public = load_key(keyfile, private=False)
+    e, n = public.key[0], public.key[1]
     logger.info("Using public key from %s", keyfile)
 
-    integer_blocks: list[int] = list(
-        file2ints(filename, number_of_bytes=(number_of_bits - 1) // 8)
-    )
-    logger.debug("Read %d blocks from %s", len(integer_blocks), filename)
+    with _open_stream(filename, "rb") as src, _open_stream(output, "wb") as dst:
+        if mode == "hybrid":
+            size = hybrid.encrypt_stream(src, dst, public.key, jobs)
+            logger.info("Encryption complete: %d bytes written to %s", size, output)
+            return
+
+        blocks = transform_stream(
+            src,
+            dst,
+            in_bytes=public.plain_bytes,
+            out_bytes=public.cipher_bytes,
+            transform=partial(pow, exp=e, mod=n),
+            jobs=jobs,
+        )
+    logger.info("Encryption complete: %d blocks written to %s", blocks, output)
 
-    encrypted_blocks: list[int] = [pow(block, e, n) for block in integer_blocks]
-    logger.debug("Encrypted all blocks.")
 
-    ints2file(
-        encrypted_blocks,
-        f"{filename}.enc",
-        number_of_bytes=(number_of_bits + 7) // 8,
-    )
-    logger.info("Encryption complete: %s.enc", filename)
+def decrypt_file(filename: str, output: str | None = None, jobs: int = 1) -> None:
+    """
+    Decrypts a file with the first file it finds named id_rsa*. Hybrid files
+    are recognised by their header, everything else is decrypted block by block.
+    :param filename: The path to the file to decrypt, "-" for stdin
+    :param output: The path to write to, "-" for stdout (default: filename.dec)
+    :param jobs: The number of worker processes, 0 for one per CPU
+    """
+    if output is None:
+        output = "-" if filename == "-" else f"{filename}.dec"
 
+    keyfile = find_key(private=True)
+    private = load_key(keyfile, private=True)
+    logger.info("Using private key from %s", keyfile)
 
-def decrypt_file(filename: str) -> None:
+    with _open_stream(filename, "rb") as src, _open_stream(output, "wb") as dst:
+        if hybrid.is_hybrid(src, private.cipher_bytes):
+            unwrap = partial(decrypt_block, private=private.key)
+            try:
+                size = hybrid.decrypt_stream(src, dst, unwrap, jobs)
+            except ValueError:
+                if output != "-":
+                    dst.close()
+                    os.remove(output)
+                raise
+            logger.info("Decryption complete: %d bytes written to %s", size, output)
+            return
+
+        blocks = transform_stream(
+            src,
+            dst,
+            in_bytes=private.cipher_bytes,
+            out_bytes=private.plain_bytes,
+            transform=partial(decrypt_block, private=private.key),
+            jobs=jobs,
+        )
+    logger.info("Decryption complete: %d blocks written to %s", blocks, output)
+
+
+def benchmark_crt_to_csv(
+    filename: str = "crt_benchmark.csv",
+    key_sizes: tuple[int, ...] = (512, 1024, 2048, 4096),
+    number_of_blocks: int = 50,
+) -> None:
     """
-    Decrypts a file with the first file it finds named id_rsa*
-    :param filename: The path to the file to decrypt
+    Measures plain pow(block, d, n) against CRT decryption for several key sizes.
+
+    :param filename: the csv file to write the results to
+    :param key_sizes: the key sizes in bits to benchmark
+    :param number_of_blocks: the number of blocks decrypted per key size
     """
-    keyfile = next(
-        (
-            f"id_rsa{bits}"
-            for bits in (2048, 1024, 512, 256, 128, 64, 32, 16, 8, 4, 2)
-            if Path(f"id_rsa{bits}").is_file()
-        ),
-        None,
-    )
-    if keyfile is None:
-        logger.error("No private key file found.")
-        raise FileNotFoundError("No private key file found.")
-
-    with open(keyfile, "r") as f:
-        d = int(f.readline().strip())
-        n = int(f.readline().strip())
-        number_of_bits = n.bit_length()
-    logger.info("Using private key from %s", keyfile)
+    rnd = SystemRandom()
+
+    with open(filename, "w", newline="") as csvfile:
+        fieldnames = ["key_size", "blocks", "plain_time", "crt_time", "speedup"]
+        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+        writer.writeheader()
+
+        for bits in key_sizes:
+            logger.info("Benchmarking CRT decryption with %d-bit keys...", bits)
+            (e, n, _), private = generate_keys(bits)
+            blocks = [pow(rnd.randrange(n), e, n) for _ in range(number_of_blocks)]
+
+            plain_time = timeit.timeit(
+                lambda: [decrypt_block(c, private[:3]) for c in blocks], number=1
+            )
+            crt_time = timeit.timeit(
+                lambda: [decrypt_block(c, private) for c in blocks], number=1
+            )
+
+            writer.writerow(
+                {
+                    "key_size": bits,
+                    "blocks": number_of_blocks,
+                    "plain_time": round(plain_time, 6),
+                    "crt_time": round(crt_time, 6),
+                    "speedup": round(plain_time / crt_time, 2),
+                }
+            )
+
+    print(f"✅ Benchmark results written to {filename}")
+
+
+def benchmark_jobs_to_csv(
+    filename: str = "jobs_benchmark.csv",
+    key_size: int = 2048,
+    number_of_blocks: int = 4096,
+    worker_counts: tuple[int, ...] = (1, 2, 4, 8, 16, 32),
+) -> None:
+    """
+    Measures decryption throughput for several numbers of worker processes.
 
-    integer_blocks = list(
-        file2ints(filename, number_of_bytes=(number_of_bits + 7) // 8)
+    :param filename: the csv file to write the results to
+    :param key_size: the key size in bits
+    :param number_of_blocks: the number of blocks decrypted per run
+    :param worker_counts: the numbers of worker processes to benchmark
+    """
+    logger.info("Generating %d-bit key for the benchmark...", key_size)
+    (e, n, _), private = generate_keys(key_size)
+    in_bytes = (key_size + 7) // 8
+    out_bytes = (key_size - 1) // 8
+
+    rnd = SystemRandom()
+    data = b"".join(
+        pow(rnd.getrandbits(out_bytes * 8), e, n).to_bytes(in_bytes, "big")
+        for _ in range(number_of_blocks)
     )
-    logger.debug("Read %d encrypted blocks from %s", len(integer_blocks), filename)
 
-    decrypted_blocks = [pow(block, d, n) for block in integer_blocks]
-    logger.debug("Decrypted all blocks.")
+    with open(filename, "w", newline="") as csvfile:
+        fieldnames = ["jobs", "blocks", "time", "mb_per_s", "speedup", "efficiency"]
+        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+        writer.writeheader()
+
+        base_time = None
+        for jobs in worker_counts:
+            logger.info("Benchmarking decryption with %d jobs...", jobs)
+            elapsed = timeit.timeit(
+                lambda: transform_stream(
+                    io.BytesIO(data),
+                    io.BytesIO(),
+                    in_bytes,
+                    out_bytes,
+                    partial(decrypt_block, private=private),
+                    jobs=jobs,
+                ),
+                number=1,
+            )
+            if base_time is None:
+                base_time = elapsed * jobs
+
+            writer.writerow(
+                {
+                    "jobs": jobs,
+                    "blocks": number_of_blocks,
+                    "time": round(elapsed, 6),
+                    "mb_per_s": round(len(data) / elapsed / 1e6, 3),
+                    "speedup": round(base_time / elapsed, 2),
+                    "efficiency": round(base_time / elapsed / jobs, 2),
+                }
+            )
+
+    print(f"✅ Benchmark results written to {filename}")
+
+
+def benchmark_profiles_to_csv(
+    filename: str = "profiles_benchmark.csv",
+    key_sizes: tuple[int, ...] = (1024, 2048, 4096),
+    number_of_blocks: int = 32,
+) -> None:
+    """
+    Measures encryption throughput of every key profile for several key sizes.
 
-    ints2file(
-        decrypted_blocks,
-        f"{filename}.dec",
-        number_of_bytes=(number_of_bits - 1) // 8,
-    )
-    logger.info("Decryption complete: %s.dec", filename)
+    :param filename: the csv file to write the results to
+    :param key_sizes: the key sizes in bits to benchmark
+    :param number_of_blocks: the number of blocks encrypted per key
+    """
+    with open(filename, "w", newline="") as csvfile:
+        fieldnames = ["key_size", "profile", "e_bits", "blocks", "time", "mb_per_s"]
+        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+        writer.writeheader()
+
+        for bits in key_sizes:
+            in_bytes = (bits - 1) // 8
+            data = os.urandom(in_bytes * number_of_blocks)
+
+            for profile in KEY_PROFILES:
+                logger.info("Benchmarking %d-bit %s keys...", bits, profile)
+                (e, n, _), _ = generate_keys(bits, profile=profile)
+                elapsed = timeit.timeit(
+                    lambda: transform_stream(
+                        io.BytesIO(data),
+                        io.BytesIO(),
+                        in_bytes,
+                        (bits + 7) // 8,
+                        partial(pow, exp=e, mod=n),
+                    ),
+                    number=1,
+                )
+
+                writer.writerow(
+                    {
+                        "key_size": bits,
+                        "profile": profile,
+                        "e_bits": e.bit_length(),
+                        "blocks": number_of_blocks,
+                        "time": round(elapsed, 6),
+                        "mb_per_s": round(len(data) / elapsed / 1e6, 3),
+                    }
+                )
+
+    print(f"✅ Benchmark results written to {filename}")
+
+
+def benchmark_modes_to_csv(
+    filename: str = "modes_benchmark.csv",
+    key_size: int = 2048,
+    block_size: int = 1 << 20,
+    hybrid_size: int = 256 << 20,
+) -> None:
+    """
+    Compares the encryption and decryption throughput of the block and the hybrid mode.
+
+    :param filename: the csv file to write the results to
+    :param key_size: the key size in bits
+    :param block_size: the number of bytes encrypted in block mode
+    :param hybrid_size: the number of bytes encrypted in hybrid mode
+    """
+    logger.info("Generating %d-bit key for the benchmark...", key_size)
+    public, private = generate_keys(key_size)
+    e, n, _ = public
+    plain_bytes, cipher_bytes = (key_size - 1) // 8, (key_size + 7) // 8
+
+    def block_encrypt(data: bytes) -> bytes:
+        dst = io.BytesIO()
+        transform_stream(
+            io.BytesIO(data), dst, plain_bytes, cipher_bytes, partial(pow, exp=e, mod=n)
+        )
+        return dst.getvalue()
+
+    def block_decrypt(data: bytes) -> bytes:
+        dst = io.BytesIO()
+        transform_stream(
+            io.BytesIO(data),
+            dst,
+            cipher_bytes,
+            plain_bytes,
+            partial(decrypt_block, private=private),
+        )
+        return dst.getvalue()
+
+    def hybrid_encrypt(data: bytes) -> bytes:
+        dst = io.BytesIO()
+        hybrid.encrypt_stream(io.BytesIO(data), dst, public)
+        return dst.getvalue()
+
+    def hybrid_decrypt(data: bytes) -> bytes:
+        dst = io.BytesIO()
+        src = io.BufferedReader(io.BytesIO(data))
+        hybrid.decrypt_stream(src, dst, partial(decrypt_block, private=private))
+        return dst.getvalue()
+
+    with open(filename, "w", newline="") as csvfile:
+        fieldnames = [
+            "mode",
+            "bytes",
+            "encrypt_mb_per_s",
+            "decrypt_mb_per_s",
+            "expansion",
+        ]
+        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+        writer.writeheader()
+
+        for mode, size, encrypt, decrypt in (
+            ("block", block_size, block_encrypt, block_decrypt),
+            ("hybrid", hybrid_size, hybrid_encrypt, hybrid_decrypt),
+        ):
+            logger.info("Benchmarking %s mode with %d bytes...", mode, size)
+            data = os.urandom(size)
+
+            start = time.perf_counter()
+            encrypted = encrypt(data)
+            encrypt_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            decrypt(encrypted)
+            decrypt_time = time.perf_counter() - start
+
+            writer.writerow(
+                {
+                    "mode": mode,
+                    "bytes": size,
+                    "encrypt_mb_per_s": round(size / encrypt_time / 1e6, 3),
+                    "decrypt_mb_per_s": round(size / decrypt_time / 1e6, 3),
+                    "expansion": round(len(encrypted) / size, 4),
+                }
+            )
+
+    print(f"✅ Benchmark results written to {filename}")
 
 
 if __name__ == "__main__":
@@ -208,10 +721,69 @@ if __name__ == "__main__":
         type=int,
     )
     group.add_argument(
-        "-e", "--encrypt", metavar="FILE", help="file to encrypt", type=str
+        "-e",
+        "--encrypt",
+        metavar="FILE",
+        nargs="+",
+        help="file to encrypt, '-' for stdin; several files, directories or globs run in batch mode",
+        type=str,
+    )
+    group.add_argument(
+        "-d",
+        "--decrypt",
+        metavar="FILE",
+        nargs="+",
+        help="file to decrypt, '-' for stdin; several files, directories or globs run in batch mode",
+        type=str,
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        metavar="FILE",
+        help="output file for a single -e/-d file, '-' for stdout "
+        "(default: FILE.enc/FILE.dec)",
+        type=str,
+    )
+    parser.add_argument(
+        "--out-dir",
+        metavar="DIR",
+        help="batch mode: mirror the input tree into DIR (default: next to each input)",
+        type=str,
+    )
+    parser.add_argument(
+        "-m",
+        "--mode",
+        default="block",
+        choices=ENCRYPTION_MODES,
+        help="encryption mode for -e (default: block); -d detects the mode itself",
+    )
+    parser.add_argument(
+        "-p",
+        "--profile",
+        default="standard",
+        choices=KEY_PROFILES,
+        help="key profile for -k (default: standard, e = 65537)",
+    )
+    parser.add_argument(
+        "--key-format",
+        default="binary",
+        choices=["binary", "text"],
+        help="key file format for -k (default: binary)",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        metavar="N",
+        default=1,
+        help="number of worker processes for -e/-d (blocks of one file, or files in "
+        "batch mode), 0 for one per CPU (default: 1)",
+        type=int,
     )
     group.add_argument(
-        "-d", "--decrypt", metavar="FILE", help="file to decrypt", type=str
+        "-b",
+        "--benchmark",
+        choices=["crt", "jobs", "profiles", "modes"],
+        help="run a benchmark and write the results to a csv file",
     )
 
     args = parser.parse_args()
@@ -223,13 +795,44 @@ if __name__ == "__main__":
         logger.setLevel(args.loglevel)
 
     if args.keygen:
-        save_keys(args.keygen)
+        save_keys(args.keygen, args.profile, args.key_format == "binary")
+        exit()
+
+    if args.encrypt or args.decrypt:
+        paths = args.encrypt or args.decrypt
+        decrypt = args.decrypt is not None
+
+        single = (
+            len(paths) == 1
+            and args.out_dir is None
+            and (paths[0] == "-" or os.path.isfile(paths[0]))
+        )
+        if not single and args.output is not None:
+            parser.error("-o/--output needs a single input file, use --out-dir")
+
+        if single:
+            if decrypt:
+                decrypt_file(paths[0], args.output, args.jobs)
+            else:
+                encrypt_file(paths[0], args.output, args.jobs, args.mode)
+        else:
+            from UE00_RSA.batch import batch_process
+
+            batch_process(paths, decrypt, args.jobs, args.out_dir, args.mode)
+        exit()
+
+    if args.benchmark == "crt":
+        benchmark_crt_to_csv()
+        exit()
+
+    if args.benchmark == "jobs":
+        benchmark_jobs_to_csv()
         exit()
 
-    if args.encrypt:
-        encrypt_file(args.encrypt)
+    if args.benchmark == "profiles":
+        benchmark_profiles_to_csv()
         exit()
 
-    if args.decrypt:
-        decrypt_file(args.decrypt)
+    if args.benchmark == "modes":
+        benchmark_modes_to_csv()
         exit()
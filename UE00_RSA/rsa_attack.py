@@ -1,42 +1,564 @@
 __author__ = "Karun Sandhu"
 
 import argparse
+import csv
+import decimal
+import json
 import logging
 import math
+import os
+import random
+import sys
+import time
+from bisect import bisect_left
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from decimal import ROUND_FLOOR, Decimal
+from functools import cache, lru_cache
+from itertools import combinations, compress, cycle, pairwise, repeat
+from pathlib import Path
+from typing import Any
+
+from UE00_RSA.keystore import MAGIC, decode_key
+from UE00_RSA.small_primes import prime_segment
 
 logger = logging.getLogger(__name__)
 
+# b^2 = a^2 - n is only passed to isqrt() if it is a square modulo 64 and
+# modulo 63 * 65 * 11, which rejects all but about 1 % of the non-squares
+SQUARE_MOD = 63 * 65 * 11
+# a is only tried if a^2 - n can be a square modulo all of these
+WHEEL_MODULI = (16, 9, 5, 7, 11, 13)
+WHEEL = math.prod(WHEEL_MODULI)
+
+# values of a per chunk of the sharded search
+CHUNK_TRIES = 1 << 24
+# seconds between two checkpoints of the sharded search
+CHECKPOINT_INTERVAL = 10.0
+
+# exact integer arithmetic for the batch GCD trees. decimal multiplies and
+# divides huge numbers much faster than int, whose division is quadratic.
+EXACT = decimal.Context(
+    prec=decimal.MAX_PREC, Emax=decimal.MAX_EMAX, Emin=decimal.MIN_EMIN
+)
+# extra digits kept in the scaled remainder tree against truncation errors
+GUARD_DIGITS = 20
+
+
+@cache
+def _squares(m: int) -> bytearray:
+    """
+    Returns a table with 1 at every square modulo m.
+
+    >>> list(_squares(8))
+    [1, 1, 0, 0, 1, 0, 0, 0]
+    """
+    table = bytearray(m)
+    for i in range(m):
+        table[i * i % m] = 1
+    return table
+
+
+@cache
+def _square_filter() -> bytearray:
+    """
+    Returns a table with 1 at every r < SQUARE_MOD that is a square modulo 63,
+    65 and 11.
+    """
+    s63, s65, s11 = _squares(63), _squares(65), _squares(11)
+    return bytearray(s63[r % 63] & s65[r % 65] & s11[r % 11] for r in range(SQUARE_MOD))
+
+
+@lru_cache(maxsize=16)
+def _wheel(n: int) -> list[int]:
+    """
+    Returns the sorted residues r modulo WHEEL for which r^2 - n is a square
+    modulo every one of WHEEL_MODULI. Other values of a can never give a
+    square b^2 = a^2 - n.
+
+    >>> len(_wheel(2021)), all(_squares(7)[(r * r - 2021) % 7] for r in _wheel(2021))
+    (3240, True)
+    """
+    residues, modulus = [0], 1
+    for m in WHEEL_MODULI:
+        squares = _squares(m)
+        allowed = [r for r in range(m) if squares[(r * r - n) % m]]
+        # Chinese remainder theorem: x = r mod modulus and x = s mod m
+        inverse = pow(modulus, -1, m)
+        residues = [
+            r + modulus * ((s - r) * inverse % m) for r in residues for s in allowed
+        ]
+        modulus *= m
+    return sorted(residues)
+
+
+def _first_a(n: int) -> int:
+    """
+    Returns the smallest a with a^2 >= n, where the Fermat search starts.
+
+    >>> _first_a(5959), _first_a(6084)
+    (78, 78)
+    """
+    a0 = math.isqrt(n)
+    return a0 if a0 * a0 == n else a0 + 1
+
+
+def _search(n: int, start: int, stop: int | None, step: bool = True) -> int | None:
+    """
+    Returns the smallest a in [start, stop) for which a^2 - n is a square,
+    or None. stop None searches without end.
+
+    >>> _search(5959, 78, 80), _search(5959, 78, 81)
+    (None, 80)
+    >>> _search(10, 4, None) is None
+    True
+    """
+    last = stop - 1 if stop is not None else math.inf
+
+    a = start
+    gaps = repeat(1)
+    if step:
+        wheel = _wheel(n)
+        if not wheel:
+            # n = 2 mod 4 is never a difference of two squares
+            return None
+        # the gaps between successive allowed residues, the last one wraps around
+        ring = [y - x for x, y in pairwise(wheel + [wheel[0] + WHEEL])]
+        i = bisect_left(wheel, start % WHEEL)
+        if i == len(wheel):
+            i = 0
+            a += WHEEL
+        a += wheel[i] - start % WHEEL
+        gaps = cycle(ring[i:] + ring[:i])
+
+    squares64, squares = _squares(64), _square_filter()
+    b2 = a * a - n
+    for gap in gaps:
+        if a > last:
+            break
+        if squares64[b2 & 63] and squares[b2 % SQUARE_MOD]:
+            b = math.isqrt(b2)
+            if b * b == b2:
+                return a
+        b2 += gap * (2 * a + gap)
+        a += gap
+    return None
+
 
-def crack_rsa(n: int, max_tries: int | None = None) -> tuple[int, int, int]:
+def crack_rsa(
+    n: int, max_tries: int | None = None, step: bool = True
+) -> tuple[int, int, int]:
     """
     Crack an RSA modulus
+
+    Fermat factorization: find a >= sqrt(n) with a^2 - n = b^2, then n = (a - b)(a + b).
+    b^2 is updated incrementally, most non-squares are rejected by table
+    lookups modulo 64 and SQUARE_MOD before isqrt() is called. With step,
+    values of a that cannot work modulo WHEEL_MODULI are skipped entirely.
+
     :param n: the RSA modulus to crack
     :param max_tries: the max tries
-    :return: the factors and the tries
+    :param step: skip values of a that cannot give a square
+    :return: the factors and the tries, the number of values of a covered (skipped ones included)
 
     >>> crack_rsa(1000001000000090000037000001961, 125)
     (1000000000000037, 1000001000000053, 125)
+    >>> crack_rsa(1000001000000090000037000001961, 125, step=False)
+    (1000000000000037, 1000001000000053, 125)
+    >>> crack_rsa(5959)
+    (59, 101, 3)
+    >>> logger.setLevel(logging.CRITICAL)
+    >>> crack_rsa(6, 10)
+    Traceback (most recent call last):
+    ...
+    ValueError: Fermat factorization failed within 10 tries
+    >>> logger.setLevel(logging.NOTSET)
+    """
+    a0 = _first_a(n)
+    a = _search(n, a0, a0 + max_tries if max_tries is not None else None, step)
+    if a is None:
+        logger.error("Reached max_tries=%s without success", max_tries)
+        raise ValueError(f"Fermat factorization failed within {max_tries} tries")
+
+    b = math.isqrt(a * a - n)
+    tries = a - a0 + 1
+    logger.info("Found factors after %d tries", tries)
+    return (a - b, a + b, tries)
+
+
+def _save_checkpoint(path: str, state: dict[str, Any]) -> None:
+    """
+    Writes the search state as JSON. The file is replaced atomically, so a
+    search killed while saving leaves the previous checkpoint intact.
+    """
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def _load_checkpoint(path: str, n: int) -> dict[str, Any]:
+    with open(path) as f:
+        state = json.load(f)
+    if state["n"] != n:
+        raise ValueError(f"{path} is a checkpoint for {state['n']}, not {n}")
+    return state
+
+
+def crack_rsa_sharded(
+    n: int,
+    max_tries: int | None = None,
+    jobs: int = 0,
+    checkpoint: str | None = None,
+    resume: bool = False,
+    step: bool = True,
+) -> tuple[int, int, int, float]:
+    """
+    Fermat factorization like crack_rsa(), spread over a process pool.
+
+    The values of a are cut into chunks of CHUNK_TRIES, chunk k belongs to
+    shard k mod shards and every shard searches its chunks in order, one at
+    a time. The position of every shard is the next a it will search, all
+    values before it are done. With checkpoint the positions are saved every
+    CHECKPOINT_INTERVAL seconds and when the search stops without a result,
+    resume continues from them. The checkpoint is deleted once the factors
+    are found.
+
+    When a shard finds a solution, the other shards still finish every chunk
+    below it, so the result is the same as the one of crack_rsa().
+
+    :param n: the RSA modulus to crack
+    :param max_tries: the max tries, counted from the first a like in crack_rsa()
+    :param jobs: the number of shards and worker processes, 0 for one per CPU
+    :param checkpoint: the file to save the search positions to
+    :param resume: continue from checkpoint, its shard count is kept
+    :param step: skip values of a that cannot give a square
+    :return: the factors, the values of a searched by all shards and the seconds spent, both summed over resumed runs
+
+    >>> crack_rsa_sharded(1000001000000090000037000001961, 125, jobs=1)[:3]
+    (1000000000000037, 1000001000000053, 125)
+    >>> import os, tempfile
+    >>> path = os.path.join(tempfile.mkdtemp(), "5959.json")
+    >>> crack_rsa_sharded(5959, 2, jobs=1, checkpoint=path)
+    Traceback (most recent call last):
+    ...
+    ValueError: Fermat factorization failed within 2 tries
+    >>> crack_rsa_sharded(5959, jobs=1, checkpoint=path, resume=True)[:3]
+    (59, 101, 3)
+    >>> os.path.exists(path)
+    False
+    >>> crack_rsa_sharded(14, jobs=1)
+    Traceback (most recent call last):
+    ...
+    ValueError: Fermat factorization failed within None tries
+    """
+    if step and not _wheel(n):
+        # every shard would give up at once and the next chunk would follow
+        raise ValueError(f"Fermat factorization failed within {max_tries} tries")
+
+    a0 = _first_a(n)
+    stop = a0 + max_tries if max_tries is not None else None
+    if resume and checkpoint and os.path.exists(checkpoint):
+        state = _load_checkpoint(checkpoint, n)
+        logger.info(
+            "Resuming %d shards after %d tries", len(state["positions"]), state["tries"]
+        )
+    else:
+        shards = jobs or os.cpu_count() or 1
+        state = {
+            "n": n,
+            "chunk": CHUNK_TRIES,
+            "positions": [a0 + k * CHUNK_TRIES for k in range(shards)],
+            "tries": 0,
+            "seconds": 0.0,
+        }
+    chunk, positions = state["chunk"], state["positions"]
+    shards = len(positions)
+
+    found: int | None = None
+    start = saved = time.perf_counter()
+    executor_type = ThreadPoolExecutor if jobs == 1 else ProcessPoolExecutor
+    with executor_type(jobs or None) as executor:
+        pending: dict[Future[int | None], tuple[int, int, int]] = {}
+
+        def submit(shard: int) -> None:
+            lo = positions[shard]
+            end = a0 + ((lo - a0) // chunk + 1) * chunk
+            hi = min(end, stop) if stop is not None else end
+            if lo < hi and (found is None or lo < found):
+                future = executor.submit(_search, n, lo, hi, step)
+                pending[future] = (shard, lo, hi)
+
+        for shard in range(shards):
+            submit(shard)
+
+        def save() -> None:
+            elapsed = state["seconds"] + time.perf_counter() - start
+            _save_checkpoint(checkpoint, {**state, "seconds": elapsed})
+
+        try:
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    shard, lo, hi = pending.pop(future)
+                    a = future.result()
+                    if a is not None:
+                        state["tries"] += a - lo + 1
+                        found = a if found is None else min(found, a)
+                        continue
+                    state["tries"] += hi - lo
+                    # the next chunk of the shard, or the rest of this one after max_tries
+                    end_of_chunk = (hi - a0) % chunk == 0
+                    positions[shard] = hi + (shards - 1) * chunk if end_of_chunk else hi
+                    submit(shard)
+
+                if checkpoint and found is None:
+                    if time.perf_counter() - saved >= CHECKPOINT_INTERVAL:
+                        save()
+                        saved = time.perf_counter()
+        except KeyboardInterrupt:
+            # the positions only cover finished chunks, so they are safe to keep
+            if checkpoint and found is None:
+                save()
+                logger.warning("Interrupted, resume from %s", checkpoint)
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    state["seconds"] += time.perf_counter() - start
+    logger.info(
+        "%d tries in %.3f s, %.0f tries/s",
+        state["tries"],
+        state["seconds"],
+        state["tries"] / state["seconds"] if state["seconds"] > 0 else 0.0,
+    )
+    if found is None:
+        if checkpoint:
+            _save_checkpoint(checkpoint, state)
+            logger.info(
+                "Stopped at max_tries=%s, resume from %s", max_tries, checkpoint
+            )
+        raise ValueError(f"Fermat factorization failed within {max_tries} tries")
+
+    if checkpoint and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    b = math.isqrt(found * found - n)
+    return (found - b, found + b, state["tries"], state["seconds"])
+
+
+def product_tree(values: list[Decimal]) -> list[list[Decimal]]:
+    """
+    Returns the levels of the product tree of values, leaves first. Every
+    node is the product of two nodes of the level below, an odd one out is
+    carried up unchanged.
+
+    >>> tree = product_tree([Decimal(v) for v in (3, 5, 7)])
+    >>> [[int(v) for v in level] for level in tree]
+    [[3, 5, 7], [15, 7], [105]]
+    """
+    with decimal.localcontext(EXACT):
+        tree = [values]
+        while len(values) > 1:
+            values = [math.prod(values[i : i + 2]) for i in range(0, len(values), 2)]
+            tree.append(values)
+    return tree
+
+
+def _digits(value: Decimal) -> int:
+    return value.adjusted() + 1
+
+
+def batch_gcd(moduli: list[int]) -> list[int]:
+    """
+    Computes gcd(n, product of all other moduli) for every modulus in
+    quasi-linear time (Bernstein's batch GCD with a scaled remainder tree).
+
+    With P the product of all moduli, P mod n^2 / n shares exactly the
+    factors of n that another modulus has. Instead of reducing P modulo the
+    squares of every node on the way down, the fraction P / (node)^2 is
+    carried down as a fixed point number: the fraction of a child is the
+    fractional part of the parent's fraction times the sibling squared. This
+    needs only multiplications and truncations.
+
+    :param moduli: the moduli
+    :return: the gcd of every modulus with the others, 1 if it shares nothing
+
+    >>> batch_gcd([3 * 5, 7 * 11, 5 * 13, 17 * 19, 17 * 23])
+    [5, 1, 5, 17, 17]
+    >>> batch_gcd([]), find_shared_factors([])
+    ([], [])
+    """
+    if not moduli:
+        return []
+    with decimal.localcontext(EXACT):
+        tree = product_tree([Decimal(n) for n in moduli])
+        root = tree.pop()[0]
+        reciprocal = decimal.Context(
+            prec=2 * _digits(root) + GUARD_DIGITS,
+            Emax=decimal.MAX_EMAX,
+            Emin=decimal.MIN_EMIN,
+        )
+        # the fraction of the root P / P^2
+        fractions = [reciprocal.divide(1, root)]
+        while tree:
+            level = tree.pop()
+            children = []
+            for i, node in enumerate(level):
+                y = fractions[i // 2]
+                if i ^ 1 < len(level):
+                    y *= level[i ^ 1] * level[i ^ 1]
+                    y -= y.to_integral_value(ROUND_FLOOR)
+                quantum = Decimal(1).scaleb(-(2 * _digits(node) + GUARD_DIGITS))
+                children.append(y.quantize(quantum, rounding=ROUND_FLOOR))
+            fractions = children
+
+        return [
+            math.gcd(n, int((y * n * n).to_integral_value()) // n)
+            for y, n in zip(fractions, moduli)
+        ]
+
+
+def find_shared_factors(
+    moduli: list[tuple[str, int]],
+) -> list[tuple[str, str, int]]:
+    """
+    Finds every pair of moduli with a common factor. batch_gcd() finds the
+    vulnerable moduli, only those are compared pairwise.
+
+    :param moduli: (label, modulus) pairs
+    :return: the labels of both moduli and their common factor (the modulus itself for duplicates)
+
+    >>> find_shared_factors([("a", 3 * 5), ("b", 7 * 11), ("c", 5 * 13), ("d", 7 * 11)])
+    [('a', 'c', 5), ('b', 'd', 77)]
+    """
+    shared = batch_gcd([n for _, n in moduli])
+    vulnerable = [m for m, g in zip(moduli, shared) if g > 1]
+    logger.info("%d of %d moduli share a factor", len(vulnerable), len(moduli))
+
+    pairs = []
+    for (label_a, a), (label_b, b) in combinations(vulnerable, 2):
+        if (g := math.gcd(a, b)) > 1:
+            pairs.append((label_a, label_b, g))
+    return pairs
+
+
+def read_moduli(paths: list[str]) -> list[tuple[str, int]]:
+    """
+    Reads moduli from key files (binary or text, named id_rsa*), from
+    directories (every id_rsa*.pub below them) and from lists with one
+    decimal modulus per line. "-" reads a list from stdin.
+
+    :param paths: the files, directories or "-"
+    :return: (label, modulus) pairs, the label is the key file or list file and line
+    """
+    moduli = []
+    for path in paths:
+        if path == "-":
+            lines = enumerate(sys.stdin, 1)
+            moduli += [(f"stdin:{i}", int(n)) for i, n in lines if n.strip()]
+        elif Path(path).is_dir():
+            for key in sorted(Path(path).rglob("id_rsa*.pub")):
+                moduli.append((str(key), decode_key(key.read_bytes())[0][1]))
+        else:
+            data = Path(path).read_bytes()
+            if data.startswith(MAGIC) or Path(path).name.startswith("id_rsa"):
+                moduli.append((path, decode_key(data)[0][1]))
+            else:
+                lines = enumerate(data.decode().splitlines(), 1)
+                moduli += [(f"{path}:{i}", int(n)) for i, n in lines if n.strip()]
+    return moduli
+
+
+def synthetic_moduli(count: int, bits: int, planted: int = 0) -> list[int]:
     """
-    a = math.isqrt(n)
-    while a**2 < n:
-        a += 1
+    Returns count pairwise coprime numbers of bits bits for benchmarking,
+    with planted pairs that share a prime factor at the start.
 
-    tries = 0
+    Real RSA moduli would take far longer to generate, so the numbers of a
+    random window [start, start + width) without a prime factor below width
+    are used: a common prime factor of two of them would divide their
+    difference, which is smaller than width.
+
+    >>> moduli = synthetic_moduli(100, 64, planted=2)
+    >>> len(moduli), [g > 1 for g in batch_gcd(moduli)][:6]
+    (100, [True, True, True, True, False, False])
+    """
+    from UE00_RSA.miller_rabin import generate_prime
+
+    width = 64 * count
     while True:
-        tries += 1
-        b2 = a**2 - n
-        b = math.isqrt(b2)
-        if b**2 == b2:
-            p = a - b
-            q = a + b
-            logger.info("Found factors after %d tries", tries)
-            return (p, q, tries)
+        start = random.getrandbits(bits - 1) | (1 << (bits - 1))
+        rough = bytearray([1]) * width
+        for q in compress(range(width), prime_segment(0, width)):
+            first = -start % q
+            rough[first::q] = bytes(len(range(first, width, q)))
+        moduli = list(compress(range(start, start + width), rough))
+        if len(moduli) >= count:
+            break
+        width *= 2
+
+    moduli = moduli[:count]
+    for i in range(planted):
+        p = generate_prime(bits // 2)
+        moduli[2 * i] = p * generate_prime(bits - bits // 2)
+        moduli[2 * i + 1] = p * generate_prime(bits - bits // 2)
+    return moduli
+
+
+def benchmark_batch_gcd_to_csv(
+    filename="benchmark_batch_gcd_results.csv",
+    counts=(1_000, 10_000, 100_000),
+    bits=512,
+    planted=4,
+):
+    """
+    Times batch_gcd() on synthetic moduli. Pairwise gcd is timed on a sample
+    of pairs and extrapolated to all count * (count - 1) / 2 pairs.
+    """
+    with open(filename, "w", newline="") as csvfile:
+        fieldnames = [
+            "count",
+            "bits",
+            "found",
+            "batch_time",
+            "moduli_per_s",
+            "pairwise_estimate",
+            "speedup",
+        ]
+        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+        writer.writeheader()
 
-        a += 1
+        for count in counts:
+            moduli = synthetic_moduli(count, bits, planted)
 
-        if max_tries is not None and tries >= max_tries:
-            logger.error("Reached max_tries=%s without success", max_tries)
-            raise ValueError(f"Fermat factorization failed within {max_tries} tries")
+            start = time.perf_counter()
+            shared = batch_gcd(moduli)
+            batch_time = time.perf_counter() - start
+
+            sample = [random.sample(moduli, 2) for _ in range(10_000)]
+            start = time.perf_counter()
+            for a, b in sample:
+                math.gcd(a, b)
+            pairwise = (time.perf_counter() - start) / len(sample)
+            pairwise *= count * (count - 1) / 2
+
+            writer.writerow(
+                {
+                    "count": count,
+                    "bits": bits,
+                    "found": sum(g > 1 for g in shared),
+                    "batch_time": round(batch_time, 6),
+                    "moduli_per_s": round(count / batch_time, 3),
+                    "pairwise_estimate": round(pairwise, 6),
+                    "speedup": round(pairwise / batch_time, 2),
+                }
+            )
+
+    print(f"✅ Benchmark results written to {filename}")
 
 
 if __name__ == "__main__":
@@ -44,16 +566,64 @@ if __name__ == "__main__":
 
     doctest.testmod()
 
+    # factor imports this module, so it can only be imported here
+    from UE00_RSA.factor import STRATEGIES, factor
+
     parser = argparse.ArgumentParser(
-        description="Crack an RSA modulus using Fermat factorization."
+        description="Crack an RSA modulus with several factoring strategies in "
+        "parallel, or with a sharded Fermat search."
+    )
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("modulus", type=int, nargs="?", help="The RSA modulus to factor")
+    group.add_argument(
+        "-g",
+        "--batch-gcd",
+        nargs="+",
+        metavar="FILE",
+        help="find moduli with a common factor in key files, directories, lists or - (stdin)",
+    )
+    group.add_argument(
+        "-b",
+        "--benchmark",
+        action="store_true",
+        help="benchmark the batch GCD on synthetic moduli",
     )
-    parser.add_argument("modulus", type=int, help="The RSA modulus to factor")
     parser.add_argument(
         "-m",
         "--max",
         type=int,
         default=None,
-        help="Maximum number of tries (default: unlimited)",
+        help="Maximum number of tries of every strategy (default: unlimited)",
+    )
+    parser.add_argument(
+        "-t", "--timeout", type=float, default=None, help="time budget in seconds"
+    )
+    parser.add_argument(
+        "-s",
+        "--strategies",
+        nargs="+",
+        choices=list(STRATEGIES),
+        default=None,
+        help="strategies to run (default: all)",
+    )
+    parser.add_argument(
+        "--no-step",
+        dest="step",
+        action="store_false",
+        help="Fermat only: try every value of a instead of skipping impossible ones",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        help="Fermat only: search in this many shards and processes, 0 for one per CPU",
+    )
+    parser.add_argument(
+        "--checkpoint", metavar="FILE", help="save the shard positions to FILE"
+    )
+    parser.add_argument(
+        "--resume", action="store_true", help="continue from the checkpoint"
     )
     parser.add_argument(
         "-v", "--verbose", action="store_true", help="Enable verbose output"
@@ -64,9 +634,48 @@ if __name__ == "__main__":
     logging.basicConfig(level=level, format="%(levelname)s: %(message)s")
 
     logger.debug("Starting with args: %s", args)
+    if args.benchmark:
+        benchmark_batch_gcd_to_csv()
+        exit()
+    if args.batch_gcd:
+        moduli = read_moduli(args.batch_gcd)
+        values = dict(moduli)
+        pairs = find_shared_factors(moduli)
+        for a, b, p in pairs:
+            if p == values[a]:
+                print(f"{a} and {b} have the same modulus")
+            else:
+                print(
+                    f"{a} and {b} share p = {p}: "
+                    f"q = {values[a] // p} and q = {values[b] // p}"
+                )
+        print(f"{len(pairs)} vulnerable pairs among {len(moduli)} moduli")
+        exit(1 if pairs else 0)
+
     try:
-        p, q, tries = crack_rsa(args.modulus, max_tries=args.max)
-        print(f"Success! p = {p}, q = {q}, tries = {tries}")
+        if args.jobs is None and not args.checkpoint and args.step:
+            result = factor(args.modulus, args.timeout, args.max, args.strategies)
+            print(
+                f"Success! p = {result.p}, q = {result.q}, "
+                f"strategy = {result.strategy}, {result.seconds:.3f} s"
+            )
+        elif args.jobs is None and not args.checkpoint:
+            p, q, tries = crack_rsa(args.modulus, max_tries=args.max, step=False)
+            print(f"Success! p = {p}, q = {q}, strategy = fermat, tries = {tries}")
+        else:
+            p, q, tries, seconds = crack_rsa_sharded(
+                args.modulus,
+                max_tries=args.max,
+                jobs=args.jobs or 0,
+                checkpoint=args.checkpoint,
+                resume=args.resume,
+                step=args.step,
+            )
+            rate = tries / seconds if seconds > 0 else 0.0
+            print(
+                f"Success! p = {p}, q = {q}, strategy = fermat, tries = {tries} "
+                f"in {seconds:.3f} s ({rate:.0f} tries/s)"
+            )
     except ValueError as e:
         logger.error("Error: %s", e)
         print(f"Failed: {e}")
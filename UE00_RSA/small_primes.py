@@ -0,0 +1,136 @@
+__author__ = "Karun Sandhu"
+
+import math
+from array import array
+from bisect import bisect_left
+from functools import cache
+from itertools import compress
+from pathlib import Path
+
+# every number below this bound can be looked up with is_small_prime()
+SMALL_PRIME_LIMIT = 1 << 20
+
+
+@cache
+def _odd_sieve() -> bytearray:
+    """
+    Sieve of Eratosthenes over the odd numbers, index i stands for 2 * i + 1.
+    Built on first use (a few milliseconds) so importing stays cheap.
+    """
+    size = SMALL_PRIME_LIMIT // 2
+    sieve = bytearray([1]) * size
+    sieve[0] = 0
+    for i in range(1, (math.isqrt(SMALL_PRIME_LIMIT - 1) - 1) // 2 + 1):
+        if sieve[i]:
+            p = 2 * i + 1
+            start = p * p // 2
+            sieve[start::p] = bytes(len(range(start, size, p)))
+    return sieve
+
+
+def is_small_prime(n: int) -> bool:
+    """
+    Looks up whether n is prime in O(1).
+
+    :param n: a number in [0, SMALL_PRIME_LIMIT)
+    :return: True if n is prime
+
+    >>> [n for n in range(20) if is_small_prime(n)]
+    [2, 3, 5, 7, 11, 13, 17, 19]
+    >>> is_small_prime(1_048_573)
+    True
+    >>> is_small_prime(SMALL_PRIME_LIMIT)
+    Traceback (most recent call last):
+    ...
+    ValueError: n must be in [0, 1048576)
+    """
+    if not 0 <= n < SMALL_PRIME_LIMIT:
+        raise ValueError(f"n must be in [0, {SMALL_PRIME_LIMIT})")
+    if n % 2 == 0:
+        return n == 2
+    return _odd_sieve()[n // 2] == 1
+
+
+@cache
+def small_primes() -> array:
+    """
+    Returns all primes below SMALL_PRIME_LIMIT as a contiguous array.
+
+    >>> primes = small_primes()
+    >>> len(primes), primes[:5].tolist(), primes[-1]
+    (82025, [2, 3, 5, 7, 11], 1048573)
+    """
+    primes = array("I", [2])
+    primes.extend(compress(range(1, SMALL_PRIME_LIMIT, 2), _odd_sieve()))
+    return primes
+
+
+def primes_below(limit: int) -> array:
+    """
+    Returns the primes below limit as an array slice of small_primes().
+
+    >>> primes_below(30).tolist()
+    [2, 3, 5, 7, 11, 13, 17, 19, 23, 29]
+    """
+    primes = small_primes()
+    return primes[: bisect_left(primes, limit)]
+
+
+def prime_segment(lo: int, hi: int) -> bytearray:
+    """
+    Segmented sieve of Eratosthenes, index i is 1 if lo + i is prime.
+
+    :param lo: the first number of the segment
+    :param hi: the end of the segment (exclusive), at most SMALL_PRIME_LIMIT ** 2
+
+    >>> list(compress(range(100, 130), prime_segment(100, 130)))
+    [101, 103, 107, 109, 113, 127]
+    """
+    sieve = bytearray([1]) * (hi - lo)
+    for q in primes_below(math.isqrt(hi - 1) + 1):
+        start = max(q * q, (lo + q - 1) // q * q)
+        sieve[start - lo :: q] = bytes(len(range(start, hi, q)))
+    for n in range(lo, min(hi, 2)):
+        sieve[n - lo] = 0
+    return sieve
+
+
+@cache
+def primorial(limit: int) -> int:
+    """
+    Returns the product of all primes below limit, so a single math.gcd() does
+    trial division by all of them.
+
+    >>> primorial(10)
+    210
+    """
+    return math.prod(primes_below(limit))
+
+
+def write_primes_module(path: Path, count: int = 100) -> None:
+    """
+    Writes the PRIMES list of the package __init__ with the first count primes.
+    Nothing in the package reads it any more, it is only kept for code that
+    imports UE00_RSA.PRIMES.
+
+    :param path: the __init__.py to write
+    :param count: the number of primes
+    """
+    lines = [
+        "# generated by python -m UE00_RSA.small_primes, do not edit",
+        "# kept for compatibility only, the package uses small_primes.small_primes()",
+        "",
+    ]
+    lines.append("PRIMES = [")
+    lines.extend(f"    {p}," for p in small_primes()[:count])
+    lines.append("]")
+    path.write_text("\n".join(lines) + "\n")
+    print(f"✅ Wrote {count} primes to {path}")
+
+
+if __name__ == "__main__":
+    import doctest
+
+    doctest.testmod()
+
+    write_primes_module(Path(__file__).with_name("__init__.py"))
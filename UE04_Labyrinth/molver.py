@@ -1,64 +1,767 @@
 __author__ = "Karun Sandhu"
 
+import argparse
+import csv
+import hashlib
+import heapq
+import mmap
+import os
+import random
+import struct
+import tempfile
 import time
-from collections import deque
+import tracemalloc
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict, deque
+from itertools import compress
+from pathlib import Path
+from typing import Any, Callable, Iterator, NamedTuple
 
+WALL = ord("#")
+GOAL = ord("A")
+# wall mask, 1 for every byte a path may step on. Line endings are walls, so
+# stepping off the side of a row always hits one.
+OPEN = bytes(0 if c in b"#\r\n" else 1 for c in range(256))
+# came-from code of the start cell, the others store the code of their move
+START = 5
+# number of goal fields and of junction graphs kept in memory
+CACHE_SIZE = 8
+# first bytes of a stored junction graph and the version of its layout
+GRAPH_MAGIC = b"MOLG"
+GRAPH_VERSION = 1
+# after GRAPH_MAGIC: version, cells, junctions and edges
+GRAPH_HEADER = struct.Struct("<Bqqq")
+# directory the goal fields and junction graphs are stored in between runs,
+# None for memory only
+CACHE_DIR: Path | None = None
 
-def dfs(maze: list[str], start: tuple[int, int]) -> list[tuple[int, int]] | None:
-    stack: deque[tuple[tuple[int, int], list[tuple[int, int]]]] = deque(
-        [(start, [start])]
-    )
-    visited: set[tuple[int, int]] = set()
 
+class Maze:
+    """
+    A maze as one flat buffer: the bytes of its file (an mmap) or a bytearray
+    in the same layout, rows of width cells followed by their line ending,
+    stride bytes apart. Cell (x, y) is at y * stride + x.
+
+    It reads like the list of rows load_maze() returns, so maze[y][x],
+    len(maze) and iterating over the rows keep working.
+
+    >>> maze = Maze.from_rows(["#A", " #"])
+    >>> maze.width, maze.height, maze.stride, maze[1], list(maze)
+    (2, 2, 3, ' #', ['#A', ' #'])
+    """
+
+    def __init__(
+        self, cells: bytearray | mmap.mmap, width: int, height: int, stride: int
+    ) -> None:
+        self.cells = cells
+        self.width = width
+        self.height = height
+        self.stride = stride
+        # the goal field and the junction graph once they are built or loaded
+        self.field: bytearray | mmap.mmap | None = None
+        self.graph: "JunctionGraph | None" = None
+        self._digest: str | None = None
+
+    @classmethod
+    def from_rows(cls, rows: list[str]) -> "Maze":
+        """
+        Packs rows into a bytearray. The width is the one of the first row,
+        shorter rows are filled up with walls.
+        """
+        width = len(rows[0]) if rows else 0
+        cells = bytearray(
+            b"\n".join(
+                row[:width].ljust(width, "#").encode("ascii", "replace") for row in rows
+            )
+        )
+        return cls(cells, width, len(rows), width + 1)
+
+    @classmethod
+    def from_file(cls, path: str) -> "Maze":
+        """
+        Maps the file into memory without reading it. Only the line endings
+        are checked, one byte per row, to make sure every row has the width
+        of the first one. Files with rows of different length are read and
+        packed with from_rows() instead.
+
+        >>> import os, tempfile
+        >>> path = os.path.join(tempfile.mkdtemp(), "maze.txt")
+        >>> with open(path, "w") as f:
+        ...     _ = f.write("####\\n#  A\\n####\\n")
+        >>> maze = Maze.from_file(path)
+        >>> type(maze.cells).__name__, maze.width, maze.height, maze[1]
+        ('mmap', 4, 3, '#  A')
+        """
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return cls.from_rows([])
+            cells = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        stride = cells.find(b"\n") + 1 or len(cells) + 1
+        ending = 2 if stride > 1 and cells[stride - 2] == ord("\r") else 1
+        height = -(-len(cells) // stride)
+        full_rows = len(cells) // stride
+        if (
+            len(cells) % stride in (0, stride - ending)
+            and cells[stride - 1 :: stride].count(b"\n") == full_rows
+        ):
+            return cls(cells, stride - ending, height, stride)
+
+        cells.close()
+        with open(path, encoding="ascii", errors="replace") as f:
+            return cls.from_rows([line.rstrip("\r\n") for line in f])
+
+    def __len__(self) -> int:
+        return self.height
+
+    def __getitem__(self, y: int) -> str:
+        if not 0 <= y < self.height:
+            raise IndexError(y)
+        start = y * self.stride
+        return self.cells[start : start + self.width].decode("latin-1")
+
+    def __iter__(self) -> Iterator[str]:
+        return (self[y] for y in range(self.height))
+
+    def index(self, x: int, y: int) -> int:
+        return y * self.stride + x
+
+    def point(self, index: int) -> tuple[int, int]:
+        y, x = divmod(index, self.stride)
+        return x, y
+
+    def moves(self) -> tuple[tuple[int, int], ...]:
+        """
+        Returns (code, offset) for the neighbours right, left, down and up.
+        """
+        return (1, 1), (2, -1), (3, self.stride), (4, -self.stride)
+
+    def path(self, came: bytearray, end: int) -> list[tuple[int, int]]:
+        """
+        Follows the came-from codes from end back to the start.
+        """
+        offsets = [offset for _, offset in self.moves()]
+        path = [end]
+        while came[end] != START:
+            end -= offsets[came[end] - 1]
+            path.append(end)
+        return [self.point(index) for index in reversed(path)]
+
+    def goals(self) -> list[int]:
+        """
+        Returns the index of every "A".
+        """
+        goals = []
+        index = self.cells.find(b"A")
+        while index != -1:
+            goals.append(index)
+            index = self.cells.find(b"A", index + 1)
+        return goals
+
+    def digest(self) -> str:
+        """
+        Returns the SHA-256 of the cells, for a mapped maze that is the hash
+        of its file.
+        """
+        if self._digest is None:
+            self._digest = hashlib.sha256(self.cells).hexdigest()
+        return self._digest
+
+    def close(self) -> None:
+        """
+        Unmaps the cells, a mapped field belongs to the LRU cache of goal_field().
+        """
+        if isinstance(self.cells, mmap.mmap):
+            self.cells.close()
+
+
+class SolverResult(NamedTuple):
+    """
+    The path a solver found (None if no "A" is reachable) and how many cells
+    it expanded on the way.
+    """
+
+    path: list[tuple[int, int]] | None
+    expanded: int
+
+
+def _as_maze(maze: list[str] | Maze) -> Maze:
+    return maze if isinstance(maze, Maze) else Maze.from_rows(maze)
+
+
+def _dfs(maze: Maze, start: tuple[int, int]) -> SolverResult:
+    cells, size, moves = maze.cells, len(maze.cells), maze.moves()
+    # 0 for unvisited cells, otherwise how the search got there
+    came = bytearray(size)
+    expanded = 0
+
+    stack = [(maze.index(*start), START)]
     while stack:
-        (x, y), path = stack.pop()
+        cell, move = stack.pop()
+        if came[cell]:
+            continue
+        came[cell] = move
+
+        if cells[cell] == GOAL:
+            return SolverResult(maze.path(came, cell), expanded)
+
+        expanded += 1
+        for move, offset in moves:
+            neighbour = cell + offset
+            if 0 <= neighbour < size and OPEN[cells[neighbour]]:
+                if not came[neighbour]:
+                    stack.append((neighbour, move))
+
+    return SolverResult(None, expanded)
+
+
+def _bfs(maze: Maze, start: tuple[int, int]) -> SolverResult:
+    cells, size, moves = maze.cells, len(maze.cells), maze.moves()
+    came = bytearray(size)
+    expanded = 0
+
+    first = maze.index(*start)
+    came[first] = START
+    queue = deque([first])
+    while queue:
+        cell = queue.popleft()
+        expanded += 1
+        for move, offset in moves:
+            neighbour = cell + offset
+            if not (0 <= neighbour < size and OPEN[cells[neighbour]]):
+                continue
+            if cells[neighbour] == GOAL:
+                path = maze.path(came, cell) + [maze.point(neighbour)]
+                return SolverResult(path, expanded)
+            if not came[neighbour]:
+                came[neighbour] = move
+                queue.append(neighbour)
+
+    return SolverResult(None, expanded)
+
+
+def _astar(maze: Maze, start: tuple[int, int]) -> SolverResult:
+    """
+    A* with the Manhattan distance to the nearest "A" as heuristic. It never
+    overestimates and changes by at most 1 per step, so the first time a
+    cell is taken from the heap its distance is final and the path found is
+    a shortest one. Ties prefer the cell closer to a goal.
+
+    >>> maze = ["#######", "#     #", "#     #", "#    A#", "#######"]
+    >>> [solve(maze, (1, 1), name).expanded for name in ("bfs", "astar")]
+    [13, 6]
+    >>> solve(maze, (1, 1), "astar").path[-3:]
+    [(5, 1), (5, 2), (5, 3)]
+    """
+    cells, size, moves = maze.cells, len(maze.cells), maze.moves()
+    goals = [maze.point(goal) for goal in maze.goals()]
+    stride = maze.stride
 
-        if (x, y) in visited:
+    def estimate(index: int) -> int:
+        y, x = divmod(index, stride)
+        return min(abs(x - gx) + abs(y - gy) for gx, gy in goals)
+
+    first = maze.index(*start)
+    if not goals:
+        return SolverResult(None, 0)
+    came = bytearray(size)
+    came[first] = START
+    # the shortest known distance from start, only for cells seen so far
+    distance = {first: 0}
+    expanded = 0
+
+    heap = [(estimate(first), estimate(first), first)]
+    while heap:
+        total, rest, cell = heapq.heappop(heap)
+        steps = total - rest
+        if steps > distance[cell]:
             continue
-        visited.add((x, y))
+        if cells[cell] == GOAL:
+            return SolverResult(maze.path(came, cell), expanded)
+
+        expanded += 1
+        for move, offset in moves:
+            neighbour = cell + offset
+            if not (0 <= neighbour < size and OPEN[cells[neighbour]]):
+                continue
+            if steps + 1 < distance.get(neighbour, size):
+                distance[neighbour] = steps + 1
+                came[neighbour] = move
+                rest = estimate(neighbour)
+                heapq.heappush(heap, (steps + 1 + rest, rest, neighbour))
+
+    return SolverResult(None, expanded)
+
+
+def _bidirectional_bfs(maze: Maze, start: tuple[int, int]) -> SolverResult:
+    """
+    BFS from start and from every "A" at the same time, one whole layer of
+    the smaller frontier at a time. The first layer that reaches a cell of
+    the other search gives a shortest path: every meeting found in it has
+    the same length, shorter paths would have met one layer earlier.
+
+    >>> maze = ["#######", "#     #", "#     #", "#    A#", "#######"]
+    >>> [solve(maze, (1, 1), name).expanded for name in ("bfs", "bidirectional")]
+    [13, 10]
+    >>> len(solve(maze, (1, 1), "bidirectional").path)
+    7
+    """
+    cells, size, moves = maze.cells, len(maze.cells), maze.moves()
+    first = maze.index(*start)
+    goals = maze.goals()
+    # came-from codes of the search from start and of the search from the goals
+    came = (bytearray(size), bytearray(size))
+    came[0][first] = START
+    for goal in goals:
+        came[1][goal] = START
+    if came[1][first]:
+        return SolverResult([start], 0)
+
+    frontiers = [[first], goals]
+    expanded = 0
+    while frontiers[0] and frontiers[1]:
+        side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+        mine, other = came[side], came[1 - side]
+        layer = []
+        for cell in frontiers[side]:
+            expanded += 1
+            for move, offset in moves:
+                neighbour = cell + offset
+                if not (0 <= neighbour < size and OPEN[cells[neighbour]]):
+                    continue
+                if mine[neighbour]:
+                    continue
+                mine[neighbour] = move
+                if other[neighbour]:
+                    forward = maze.path(came[0], neighbour)
+                    backward = maze.path(came[1], neighbour)
+                    return SolverResult(forward + backward[-2::-1], expanded)
+                layer.append(neighbour)
+        frontiers[side] = layer
+
+    return SolverResult(None, expanded)
+
+
+def _goal_field(maze: Maze) -> bytearray:
+    cells, size, moves = maze.cells, len(maze.cells), maze.moves()
+    came = bytearray(size)
+    goals = maze.goals()
+    for goal in goals:
+        came[goal] = START
+
+    queue = deque(goals)
+    while queue:
+        cell = queue.popleft()
+        for move, offset in moves:
+            neighbour = cell + offset
+            if 0 <= neighbour < size and OPEN[cells[neighbour]]:
+                if not came[neighbour]:
+                    came[neighbour] = move
+                    queue.append(neighbour)
+    return came
+
+
+_fields: OrderedDict[str, bytearray | mmap.mmap] = OrderedDict()
+_graphs: OrderedDict[str, "JunctionGraph"] = OrderedDict()
+
+
+def _cached(
+    maze: Maze,
+    cache: OrderedDict[str, Any],
+    suffix: str,
+    cache_dir: str | Path | None,
+    build: Callable[[Maze], Any],
+    save: Callable[[Any, Path], None],
+    load: Callable[[Path, Maze], Any],
+) -> Any:
+    """
+    Returns build(maze) from the LRU cache, from <digest>.<suffix> in
+    cache_dir or freshly built (and then stored in both).
+    """
+    digest = maze.digest()
+    value = cache.get(digest)
+    path = Path(cache_dir) / f"{digest}.{suffix}" if cache_dir is not None else None
+    if value is None and path is not None and path.is_file():
+        value = load(path, maze)
+    if value is None:
+        value = build(maze)
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(path.name + ".tmp")
+            save(value, tmp)
+            os.replace(tmp, path)
+
+    cache[digest] = value
+    cache.move_to_end(digest)
+    if len(cache) > CACHE_SIZE:
+        cache.popitem(last=False)
+    return value
+
+
+def _map_field(path: Path, maze: Maze) -> mmap.mmap | None:
+    """
+    Maps a stored field read-only, None if its size does not fit the maze.
+    The mapping is shared through the LRU cache, so closing one Maze must not
+    close it.
+
+    >>> import tempfile
+    >>> with tempfile.TemporaryDirectory() as tmp:
+    ...     path = Path(tmp, "maze.txt")
+    ...     _ = path.write_text("####\\n#A #\\n####\\n")
+    ...     maze = Maze.from_file(path)
+    ...     _ = goal_field(maze, tmp)
+    ...     maze.close()
+    ...     _ = _fields.pop(maze.digest())
+    ...     maze = Maze.from_file(path)
+    ...     mapped = type(goal_field(maze, tmp)).__name__
+    ...     maze.close()
+    ...     maze = Maze.from_file(path)
+    ...     found = solve(maze, (2, 1), "field").path
+    ...     maze.close()
+    ...     _fields.pop(maze.digest()).close()
+    >>> mapped, found
+    ('mmap', [(2, 1), (1, 1)])
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size != len(maze.cells) or not maze.cells:
+            return None
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def goal_field(
+    maze: Maze, cache_dir: str | Path | None = None
+) -> bytearray | mmap.mmap:
+    """
+    Returns the came-from codes of one BFS from every "A" at once. Following
+    them from any cell walks a shortest path to the nearest "A", cells
+    without a path have 0.
+
+    The field is built once per maze. It is kept on the Maze, in an LRU
+    cache keyed by Maze.digest() and, with cache_dir, in a file named after
+    the digest that is mapped into memory on the next run.
+
+    >>> maze = Maze.from_rows(["#####", "#  A#", "# # #", "#####"])
+    >>> list(goal_field(maze)[7:10]), goal_field(maze) is maze.field
+    ([2, 2, 5], True)
+    """
+    if maze.field is None:
+        maze.field = _cached(
+            maze,
+            _fields,
+            "field",
+            cache_dir,
+            _goal_field,
+            lambda field, path: path.write_bytes(field),
+            _map_field,
+        )
+    return maze.field
+
+
+def _field_path(maze: Maze, start: tuple[int, int]) -> SolverResult:
+    """
+    Answers from goal_field() with CACHE_DIR by walking the came-from codes,
+    which takes time proportional to the path. Nothing is expanded, the
+    search happened once when the field was built.
+
+    >>> solve(["#####", "#  A#", "# # #", "#####"], (1, 2), "field")
+    SolverResult(path=[(1, 2), (1, 1), (2, 1), (3, 1)], expanded=0)
+    """
+    field = goal_field(maze, CACHE_DIR)
+    index = maze.index(*start)
+    if not field[index]:
+        return SolverResult(None, 0)
+    return SolverResult(maze.path(field, index)[::-1], 0)
+
 
-        if maze[y][x] == "A":
+class JunctionGraph(NamedTuple):
+    """
+    A maze after dead-end filling with its corridors contracted. live is 0
+    for walls and filled cells, 1 for corridor cells and 2 for junctions: the
+    goals and every live cell without exactly two live neighbours. The edges
+    of junction i are first[i]:first[i + 1], edge e leads to junction
+    target[e] in weight[e] steps, the first of them is move[e]. out is the
+    move from a filled cell towards the live cells, 0 if there is none.
+    """
+
+    live: bytearray
+    out: bytearray
+    nodes: array
+    first: array
+    target: array
+    weight: array
+    move: bytearray
+
+
+def _corridor(live: bytearray, offsets: list[int], cell: int, offset: int) -> list[int]:
+    """
+    Walks from cell in the direction of offset along the corridor, returns
+    every cell after cell up to the next junction. On a ring without one it
+    stops when it is back at cell.
+    """
+    size = len(live)
+    path = []
+    previous, current = cell, cell + offset
+    while True:
+        path.append(current)
+        if live[current] == 2 or current == cell:
             return path
+        for step in offsets:
+            following = current + step
+            if following != previous and 0 <= following < size and live[following]:
+                break
+        else:
+            return path
+        previous, current = current, following
 
-        for nx, ny in [
-            (x + 1, y),
-            (x - 1, y),
-            (x, y + 1),
-            (x, y - 1),
-        ]:
-            if 0 <= ny < len(maze) and 0 <= nx < len(maze[0]):
-                if maze[ny][nx] != "#":
-                    stack.append(((nx, ny), path + [(nx, ny)]))
 
-    return None
+def _contract(maze: Maze) -> JunctionGraph:
+    cells, size, moves = maze.cells, len(maze.cells), maze.moves()
+    offsets = [offset for _, offset in moves]
+    live = bytearray(cells).translate(OPEN)
+    out = bytearray(size)
 
+    # dead-end filling: open cells with at most one open neighbour can not be
+    # on a path between two other cells, removing one can make the next one a
+    # dead end. Goals are kept. Every filled region is a tree hanging off a
+    # single live cell, so the one neighbour left is the only way out.
+    stack = list(compress(range(size), live))
+    while stack:
+        cell = stack.pop()
+        if not live[cell] or cells[cell] == GOAL:
+            continue
+        exits = [
+            (code, cell + offset)
+            for code, offset in moves
+            if 0 <= cell + offset < size and live[cell + offset]
+        ]
+        if len(exits) <= 1:
+            live[cell] = 0
+            if exits:
+                out[cell], neighbour = exits[0]
+                stack.append(neighbour)
 
-def bfs(maze: list[str], start: tuple[int, int]) -> list[tuple[int, int]] | None:
-    queue: deque[tuple[tuple[int, int], list[tuple[int, int]]]] = deque(
-        [(start, [start])]
+    for cell in compress(range(size), live):
+        degree = 0
+        for offset in offsets:
+            if 0 <= cell + offset < size and live[cell + offset]:
+                degree += 1
+        if degree != 2 or cells[cell] == GOAL:
+            live[cell] = 2
+    nodes = array(
+        "q", (cell for cell in compress(range(size), live) if live[cell] == 2)
     )
-    visited: set[tuple[int, int]] = set()
 
-    while queue:
-        (x, y), path = queue.popleft()
+    first, target, weight, move = array("q", [0]), array("q"), array("q"), bytearray()
+    for node in nodes:
+        for code, offset in moves:
+            if 0 <= node + offset < size and live[node + offset]:
+                path = _corridor(live, offsets, node, offset)
+                if path[-1] != node:
+                    target.append(bisect_left(nodes, path[-1]))
+                    weight.append(len(path))
+                    move.append(code)
+        first.append(len(target))
+    return JunctionGraph(live, out, nodes, first, target, weight, move)
+
+
+def _save_graph(graph: JunctionGraph, path: Path) -> None:
+    with open(path, "wb") as f:
+        f.write(GRAPH_MAGIC)
+        f.write(
+            GRAPH_HEADER.pack(
+                GRAPH_VERSION, len(graph.live), len(graph.nodes), len(graph.move)
+            )
+        )
+        f.write(graph.live)
+        f.write(graph.out)
+        for part in (graph.nodes, graph.first, graph.target, graph.weight):
+            f.write(part.tobytes())
+        f.write(graph.move)
+
+
+def _load_graph(path: Path, maze: Maze) -> JunctionGraph | None:
+    """
+    Reads a graph written by _save_graph(), None if it has another version,
+    does not fit the maze or is truncated.
+
+    >>> import tempfile
+    >>> maze = Maze.from_rows(["#####", "#A# #", "#   #", "#####"])
+    >>> with tempfile.TemporaryDirectory() as tmp:
+    ...     path = Path(tmp, "maze.graph")
+    ...     _save_graph(_contract(maze), path)
+    ...     loaded = _load_graph(path, maze) == _contract(maze)
+    ...     _ = path.write_bytes(path.read_bytes()[:-1])
+    ...     truncated = _load_graph(path, maze)
+    >>> loaded, truncated
+    (True, None)
+    """
+    data = path.read_bytes()
+    header = len(GRAPH_MAGIC) + GRAPH_HEADER.size
+    if not data.startswith(GRAPH_MAGIC) or len(data) < header:
+        return None
+    version, size, count, edges = GRAPH_HEADER.unpack_from(data, len(GRAPH_MAGIC))
+    itemsize = array("q").itemsize
+    expected = header + 2 * size + itemsize * (2 * count + 1 + 2 * edges) + edges
+    if version != GRAPH_VERSION or size != len(maze.cells) or len(data) != expected:
+        return None
+
+    live = bytearray(data[header : header + size])
+    out = bytearray(data[header + size : header + 2 * size])
+    position = header + 2 * size
+    parts = []
+    for length in (count, count + 1, edges, edges):
+        part = array("q")
+        part.frombytes(data[position : position + length * part.itemsize])
+        position += length * part.itemsize
+        parts.append(part)
+    return JunctionGraph(live, out, *parts, bytearray(data[position:]))
+
+
+def junction_graph(maze: Maze, cache_dir: str | Path | None = None) -> JunctionGraph:
+    """
+    Returns the junction graph of the maze, cached like goal_field().
+
+    >>> maze = Maze.from_rows(["#######", "#   # #", "# #   #", "#   # #", "###A###"])
+    >>> graph = junction_graph(maze)
+    >>> [maze.point(node) for node in graph.nodes], list(graph.weight)
+    ([(3, 3), (3, 4)], [1, 1])
+    """
+    if maze.graph is None:
+        maze.graph = _cached(
+            maze, _graphs, "graph", cache_dir, _contract, _save_graph, _load_graph
+        )
+    return maze.graph
 
-        if (x, y) in visited:
+
+def _junction_path(maze: Maze, start: tuple[int, int]) -> SolverResult:
+    """
+    Solves on junction_graph() with CACHE_DIR. A start in a filled dead end
+    first follows out to the live cells, a start inside a corridor walks both
+    ways to its junctions. Dijkstra runs on the junctions from there and the
+    corridors of the edges it takes are walked again to get the cells.
+    expanded counts the junctions Dijkstra settles.
+
+    >>> maze = ["#######", "#   # #", "# #   #", "#   # #", "###A###"]
+    >>> solve(maze, (5, 1), "junctions")
+    SolverResult(path=[(5, 1), (5, 2), (4, 2), (3, 2), (3, 3), (3, 4)], expanded=2)
+    """
+    graph = junction_graph(maze, CACHE_DIR)
+    live, out, nodes = graph.live, graph.out, graph.nodes
+    cells, size, moves = maze.cells, len(maze.cells), maze.moves()
+    offsets = [offset for _, offset in moves]
+
+    entry = maze.index(*start)
+    prefix = [entry]
+    while not live[entry]:
+        if not out[entry]:
+            return SolverResult(None, 0)
+        entry += offsets[out[entry] - 1]
+        prefix.append(entry)
+
+    # the cells from entry to the junctions Dijkstra starts from
+    sources: dict[int, list[int]] = {}
+    if live[entry] == 2:
+        sources[bisect_left(nodes, entry)] = []
+    else:
+        for offset in offsets:
+            if 0 <= entry + offset < size and live[entry + offset]:
+                path = _corridor(live, offsets, entry, offset)
+                node = bisect_left(nodes, path[-1])
+                if live[path[-1]] != 2:
+                    continue
+                if node not in sources or len(path) < len(sources[node]):
+                    sources[node] = path
+
+    distance = {node: len(path) for node, path in sources.items()}
+    via: dict[int, tuple[int, int]] = {}
+    heap = [(steps, node) for node, steps in distance.items()]
+    heapq.heapify(heap)
+    goal = None
+    expanded = 0
+    while heap:
+        steps, node = heapq.heappop(heap)
+        if steps > distance[node]:
             continue
-        visited.add((x, y))
+        expanded += 1
+        if cells[nodes[node]] == GOAL:
+            goal = node
+            break
+        for edge in range(graph.first[node], graph.first[node + 1]):
+            neighbour = graph.target[edge]
+            if steps + graph.weight[edge] < distance.get(neighbour, size):
+                distance[neighbour] = steps + graph.weight[edge]
+                via[neighbour] = (node, edge)
+                heapq.heappush(heap, (distance[neighbour], neighbour))
+    if goal is None:
+        return SolverResult(None, expanded)
+
+    edges = []
+    node = goal
+    while node in via:
+        node, edge = via[node]
+        edges.append((node, edge))
+    path = prefix + sources[node]
+    for node, edge in reversed(edges):
+        offset = offsets[graph.move[edge] - 1]
+        path += _corridor(live, offsets, nodes[node], offset)
+    return SolverResult([maze.point(cell) for cell in path], expanded)
+
+
+def find_start(maze: list[str] | Maze) -> tuple[int, int]:
+    """
+    Returns the position of "S", or (1, 1) if the maze has none.
+
+    >>> find_start(["####", "# S#", "#A##"]), find_start(["###", "#A#"])
+    ((2, 1), (1, 1))
+    """
+    maze = _as_maze(maze)
+    index = maze.cells.find(b"S")
+    return maze.point(index) if index != -1 else (1, 1)
+
+
+SOLVERS: dict[str, Callable[[Maze, tuple[int, int]], SolverResult]] = {
+    "dfs": _dfs,
+    "bfs": _bfs,
+    "astar": _astar,
+    "bidirectional": _bidirectional_bfs,
+    "field": _field_path,
+    "junctions": _junction_path,
+}
+
+
+def solve(
+    maze: list[str] | Maze, start: tuple[int, int], solver: str = "bfs"
+) -> SolverResult:
+    """
+    Solves the maze from start with a solver from SOLVERS.
+
+    >>> maze = ["#####", "#  A#", "# # #", "#####"]
+    >>> [len(solve(maze, (1, 2), name).path) for name in SOLVERS]
+    [4, 4, 4, 4, 4, 4]
+    """
+    return SOLVERS[solver](_as_maze(maze), start)
+
+
+def dfs(maze: list[str] | Maze, start: tuple[int, int]) -> list[tuple[int, int]] | None:
+    """
+    Depth first search from start to the first "A" it reaches. Neighbours are
+    pushed right, left, down, up, so the last one is explored first.
+
+    >>> dfs(["#####", "#  A#", "# # #", "#####"], (1, 1))
+    [(1, 1), (2, 1), (3, 1)]
+    """
+    return solve(maze, start, "dfs").path
 
-        for nx, ny in [
-            (x + 1, y),
-            (x - 1, y),
-            (x, y + 1),
-            (x, y - 1),
-        ]:
-            if 0 <= ny < len(maze) and 0 <= nx < len(maze[0]):
-                if maze[ny][nx] != "#":
-                    if maze[ny][nx] == "A":
-                        return path + [(nx, ny)]
-                    queue.append(((nx, ny), path + [(nx, ny)]))
 
-    return None
+def bfs(maze: list[str] | Maze, start: tuple[int, int]) -> list[tuple[int, int]] | None:
+    """
+    Breadth first search from start, returns a shortest path to an "A".
+
+    >>> bfs(["#####", "#  A#", "# # #", "#####"], (1, 2))
+    [(1, 2), (1, 1), (2, 1), (3, 1)]
+    """
+    return solve(maze, start, "bfs").path
 
 
 def load_maze(path):
@@ -66,15 +769,217 @@ def load_maze(path):
         return [line.strip() for line in f]
 
 
-def mark_map(maze: list[str], path: list[tuple[int, int]]) -> list[str]:
-    maze_copy = [list(row) for row in maze]
+def mark_map(maze: list[str] | Maze, path: list[tuple[int, int]]) -> list[str]:
+    marks: dict[int, list[int]] = {}
     for x, y in path:
-        if maze_copy[y][x] not in ("S", "A"):
-            maze_copy[y][x] = "."
-    return ["".join(row) for row in maze_copy]
+        marks.setdefault(y, []).append(x)
+
+    rows = []
+    for y, row in enumerate(maze):
+        if y in marks:
+            chars = list(row)
+            for x in marks[y]:
+                if chars[x] not in ("S", "A"):
+                    chars[x] = "."
+            row = "".join(chars)
+        rows.append(row)
+    return rows
+
+
+def generate_maze(
+    width: int, height: int, seed: int | None = None, braid: float = 0.0
+) -> list[str]:
+    """
+    Generates a perfect maze (exactly one path between two cells) with a
+    randomized depth first search. Width and height should be odd, the start
+    is (1, 1) and the goal "A" is in the bottom right corner. braid is the
+    fraction of the remaining inner walls that are removed afterwards, which
+    adds loops and open areas.
+
+    >>> maze = generate_maze(21, 11, seed=1)
+    >>> len(maze), len(maze[0]), maze[9][19]
+    (11, 21, 'A')
+    >>> len(bfs(maze, (1, 1))) == len(dfs(maze, (1, 1)))
+    True
+    """
+    rng = random.Random(seed)
+    grid = [bytearray(b"#" * width) for _ in range(height)]
+    grid[1][1] = ord(" ")
+    stack = [(1, 1)]
+    while stack:
+        x, y = stack[-1]
+        options = [
+            (x + dx, y + dy)
+            for dx, dy in ((2, 0), (-2, 0), (0, 2), (0, -2))
+            if 0 < x + dx < width - 1
+            and 0 < y + dy < height - 1
+            and grid[y + dy][x + dx] == WALL
+        ]
+        if not options:
+            stack.pop()
+            continue
+        nx, ny = rng.choice(options)
+        grid[(y + ny) // 2][(x + nx) // 2] = grid[ny][nx] = ord(" ")
+        stack.append((nx, ny))
+
+    if braid:
+        # the walls between two cells, exactly one of x and y is even
+        for y in range(1, height - 1):
+            for x in range(1 + y % 2, width - 1, 2):
+                if rng.random() < braid:
+                    grid[y][x] = ord(" ")
+
+    grid[height - 2][width - 2] = GOAL
+    return [row.decode() for row in grid]
+
+
+def _best_of(func: Callable[[], Any], repeat: int) -> tuple[Any, float]:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return result, round(min(times), 6)
+
+
+def _heap_bytes(func: Callable[[], Any]) -> int:
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def benchmark_solvers_to_csv(
+    filename="benchmark_molver_results.csv",
+    files=("./UE04_Labyrinth/l3.txt",),
+    sizes=(501, 1001, 2001),
+    braids=(0.0, 0.3),
+    repeat=3,
+):
+    """
+    Times loading with load_maze() and Maze.from_file() and solving with
+    every solver in SOLVERS from (1, 1) on the maze files and on generated
+    mazes of the given sizes and braid fractions, the best of repeat runs is
+    written. heap_bytes is the peak of Python allocations while loading,
+    goal_field and junction_graph the time to build what the field and the
+    junctions solver work on, nodes the number of junctions left.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [(path, path) for path in files]
+        for n in sizes:
+            for braid in braids:
+                path = os.path.join(tmp, f"{n}-{braid}.txt")
+                with open(path, "w") as f:
+                    maze = generate_maze(n, n, seed=n, braid=braid)
+                    f.write("\n".join(maze) + "\n")
+                paths.append((f"generated {n}x{n} braid {braid}", path))
+
+        with open(filename, "w", newline="") as csvfile:
+            fieldnames = [
+                "maze",
+                "cells",
+                "step",
+                "path_length",
+                "expanded",
+                "nodes",
+                "seconds",
+                "heap_bytes",
+            ]
+            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+            writer.writeheader()
+
+            for label, path in paths:
+                for name, loader in (
+                    ("load_maze", load_maze),
+                    ("Maze.from_file", Maze.from_file),
+                ):
+                    maze, seconds = _best_of(lambda: loader(path), repeat)
+                    writer.writerow(
+                        {
+                            "maze": label,
+                            "cells": len(maze) * len(maze[0]),
+                            "step": name,
+                            "seconds": seconds,
+                            "heap_bytes": _heap_bytes(lambda: loader(path)),
+                        }
+                    )
+
+                # fresh builds, solve() below reuses the cached field and graph
+                _, seconds = _best_of(lambda: _goal_field(maze), repeat)
+                writer.writerow(
+                    {
+                        "maze": label,
+                        "cells": maze.width * maze.height,
+                        "step": "goal_field",
+                        "seconds": seconds,
+                    }
+                )
+                graph, seconds = _best_of(lambda: _contract(maze), repeat)
+                writer.writerow(
+                    {
+                        "maze": label,
+                        "cells": maze.width * maze.height,
+                        "step": "junction_graph",
+                        "nodes": len(graph.nodes),
+                        "seconds": seconds,
+                    }
+                )
+
+                for name in SOLVERS:
+                    result, seconds = _best_of(
+                        lambda: solve(maze, (1, 1), name), repeat
+                    )
+                    writer.writerow(
+                        {
+                            "maze": label,
+                            "cells": maze.width * maze.height,
+                            "step": name,
+                            "path_length": len(result.path) if result.path else None,
+                            "expanded": result.expanded,
+                            "seconds": seconds,
+                        }
+                    )
+                maze.close()
+
+    print(f"✅ Benchmark results written to {filename}")
 
 
 if __name__ == "__main__":
+    import doctest
+
+    doctest.testmod()
+
+    parser = argparse.ArgumentParser(description="Solve mazes.")
+    parser.add_argument(
+        "-s",
+        "--solvers",
+        nargs="+",
+        choices=list(SOLVERS),
+        default=list(SOLVERS),
+        help="solvers to run (default: all)",
+    )
+    parser.add_argument(
+        "-b",
+        "--benchmark",
+        action="store_true",
+        help="benchmark the solvers on l3.txt and generated mazes",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=Path.home() / ".cache" / "molver",
+        type=Path,
+        help="where goal fields and junction graphs are kept "
+        "(default: ~/.cache/molver)",
+    )
+    args = parser.parse_args()
+    CACHE_DIR = args.cache_dir
+
+    if args.benchmark:
+        benchmark_solvers_to_csv()
+        exit()
+
     maze_files = [
         ("L1", "./UE04_Labyrinth/l1.txt"),
         ("L2", "./UE04_Labyrinth/l2.txt"),
@@ -82,28 +987,19 @@ if __name__ == "__main__":
     ]
 
     for label, path in maze_files:
-        maze = load_maze(path)
-
-        start = time.perf_counter()
-        dfs_result = dfs(maze, (1, 1))  # or whatever your start coordinate is
-        elapsed = time.perf_counter() - start
-
-        if label == "L2" and dfs_result is not None:
-            print("\n".join(mark_map(maze, dfs_result)))
+        maze = Maze.from_file(path)
+        start_cell = find_start(maze)
 
-        print(
-            f"DFS {label} found path of length {len(dfs_result) if dfs_result else 'None'} "
-            f"in {elapsed:.6f} seconds"
-        )
-
-        start = time.perf_counter()
-        bfs_result = bfs(maze, (1, 1))  # or whatever your start coordinate is
-        elapsed = time.perf_counter() - start
+        for name in args.solvers:
+            start = time.perf_counter()
+            result = solve(maze, start_cell, name)
+            elapsed = time.perf_counter() - start
 
-        if label == "L2" and bfs_result is not None:
-            print("\n".join(mark_map(maze, bfs_result)))
+            if label == "L2" and result.path is not None:
+                print("\n".join(mark_map(maze, result.path)))
 
-        print(
-            f"BFS {label} found path of length {len(bfs_result) if bfs_result else 'None'} "
-            f"in {elapsed:.6f} seconds"
-        )
+            print(
+                f"{name.upper()} {label} found path of length "
+                f"{len(result.path) if result.path else 'None'} "
+                f"in {elapsed:.6f} seconds, {result.expanded} cells expanded"
+            )